@@ -7,6 +7,7 @@ from zoneinfo import ZoneInfo
 
 # Timezone consistente con conversation_state.py y outbound_panel.py
 TIMEZONE_BOGOTA = ZoneInfo("America/Bogota")
+from itertools import chain
 from typing import Dict, Any
 from state_manager import ConversationState, ConversationStatus
 from integrations.hubspot import hubspot_client as _hs_singleton
@@ -508,8 +509,8 @@ class CRMAgent:
             lead_name = state.lead_data.get('name', 'Lead')
             name_parts = split_full_name(lead_name)
 
-            # Formatear historial de conversación (general + CRM)
-            full_history = state.history + state.lead_data.get('crm_history', [])
+            # Formatear historial de conversación (general + CRM) sin concatenar listas
+            full_history = chain(state.history, state.lead_data.get('crm_history', []))
             conversation_text = format_conversation_history(full_history)
 
             # Preparar metadata de propiedad
@@ -864,6 +864,20 @@ async def rebuild_zset_from_conversations():
         )
 
 
+async def reconcile_orphan_leads():
+    """
+    Cada 1h: reconcilia leads del chatbot sin owner (últimas 2h).
+    Recupera las verificaciones diferidas de contact.creation que se
+    perdieron si el proceso se reinició antes de ejecutarlas.
+    """
+    await apply_jitter()
+    try:
+        from middleware.webhook_handler import reconcile_orphan_leads as _reconcile
+        await _reconcile(hours_window=2)
+    except Exception as e:
+        logger.error("[OrphanReconcile] Error: %s", e, exc_info=True)
+
+
 async def reconcile_owner_ids():
     """
     Cada 6h: cross-referencia Redis assigned_owner_id vs MongoDB owner_id
@@ -1553,6 +1567,14 @@ async def startup_event():
     except Exception as e:
         logger.error("[STARTUP] ⚠️ Error cargando KB: %s", e)
 
+    # Webhook HubSpot → WhatsApp: cada worker atiende webhooks, así que todos
+    # crean el handler y calientan Redis/HTTP antes de recibir tráfico
+    try:
+        from integrations.hubspot import get_outbound_handler
+        await get_outbound_handler().warmup()
+    except Exception as e:
+        logger.error("[STARTUP] ⚠️ Error inicializando OutboundHandler: %s", e)
+
     # Scheduler: solo UN worker por instancia Railway ejecuta los jobs.
     # Sin lock, N workers corren cada job independientemente:
     #   - check_appointment_reminders efectivo cada 15 min → Rate Limit HubSpot + duplicados
@@ -1793,6 +1815,17 @@ async def startup_event():
         except Exception as _erc:
             logger.error("[STARTUP] FALLO registrando reconcile_owner_ids: %s", _erc, exc_info=True)
 
+        try:
+            scheduler.add_job(
+                reconcile_orphan_leads,
+                trigger=IntervalTrigger(hours=1),
+                id="reconcile_orphan_leads",
+                replace_existing=True,
+            )
+            logger.info("[STARTUP] Reconciliación leads sin owner HABILITADA (cada 1h)")
+        except Exception as _ero:
+            logger.error("[STARTUP] FALLO registrando reconcile_orphan_leads: %s", _ero, exc_info=True)
+
         scheduler.start()
         registered_job_ids = [j.id for j in scheduler.get_jobs()]
         logger.info(
@@ -1852,6 +1885,13 @@ async def shutdown_event():
         scheduler.shutdown(wait=False)
         logger.info("[SHUTDOWN] Schedulers detenidos")
 
+    # 1b. Cancelar verificaciones diferidas de contactos nuevos (esperan hasta 120s)
+    try:
+        from middleware.webhook_handler import close_orphan_monitor
+        await close_orphan_monitor()
+    except Exception as e:
+        logger.warning(f"[SHUTDOWN] Error cancelando verificaciones de huérfanos: {e}")
+
     # 2. Cerrar el singleton de ConversationStateManager
     try:
         if _global_state_manager is not None:
@@ -1869,6 +1909,27 @@ async def shutdown_event():
     except Exception as e:
         logger.warning(f"[SHUTDOWN] Error cerrando MongoDB: {e}")
 
+    # 4. Cerrar el pool HTTP del singleton de HubSpot
+    try:
+        from integrations.hubspot import hubspot_client
+        await hubspot_client.aclose()
+    except Exception as e:
+        logger.warning(f"[SHUTDOWN] Error cerrando cliente HubSpot: {e}")
+
+    # 5. Cerrar el pool Redis del LeadAssigner (solo existe si se usó Redis)
+    try:
+        from integrations.hubspot.lead_assigner import lead_assigner
+        lead_assigner.close()
+    except Exception as e:
+        logger.warning(f"[SHUTDOWN] Error cerrando Redis de LeadAssigner: {e}")
+
+    # 6. Cerrar el cliente HTTP global del panel (también usado por alertas de webhook)
+    try:
+        from middleware.outbound_panel import close_httpx_client
+        await close_httpx_client()
+    except Exception as e:
+        logger.warning(f"[SHUTDOWN] Error cerrando cliente HTTP global: {e}")
+
     logger.info("[SHUTDOWN] Proceso de cierre completado")
 
 
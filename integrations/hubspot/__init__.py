@@ -8,6 +8,7 @@ Componentes:
 - contact_finder.py: Búsqueda robusta de contactos por teléfono
 - timeline_logger.py: Registro de eventos en Timeline de HubSpot
 - outbound_handler.py: Webhook para mensajes HubSpot -> WhatsApp
+- chaos.py: Inyección de fallas para pruebas de resiliencia (desactivado por defecto)
 """
 
 from .hubspot_client import HubSpotClient
@@ -39,6 +40,12 @@ def get_outbound_handler():
     return _get_handler()
 
 
+def get_lead_counter():
+    """Obtiene el LeadCounter para conteos de leads pendientes."""
+    from .lead_counter import get_lead_counter as _get_counter
+    return _get_counter()
+
+
 def get_outbound_router():
     """Obtiene el router de FastAPI para webhooks de salida."""
     from .outbound_handler import router
@@ -56,5 +63,6 @@ __all__ = [
     "get_contact_finder",
     "get_timeline_logger",
     "get_outbound_handler",
+    "get_lead_counter",
     "get_outbound_router",
 ]
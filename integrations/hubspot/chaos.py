@@ -0,0 +1,106 @@
+# integrations/hubspot/chaos.py
+"""
+Inyección de fallas (chaos testing) para HubSpotClient._request.
+
+Desactivado por defecto. Se activa con variables de entorno para validar
+retry, circuit breaker y bulkhead contra fallas realistas de HubSpot:
+
+- HUBSPOT_CHAOS_RATE: probabilidad (0..1) de inyectar una falla por request
+- HUBSPOT_CHAOS_FAULTS: lista separada por comas (default: todas)
+- CHAOS_SEED: semilla del RNG para reproducir una secuencia de fallas
+"""
+
+import os
+import random
+import asyncio
+from typing import Optional, Sequence
+
+import httpx
+
+from logging_config import logger
+
+
+class ChaosMiddleware:
+    """
+    Decide por request si inyectar una falla.
+
+    Las fallas HTTP se devuelven como respuestas sintéticas para que recorran
+    el mismo camino que una respuesta real (raise_for_status, .json()).
+    """
+
+    NETWORK_TIMEOUT = "network_timeout"
+    HTTP_5XX = "http_5xx"
+    HTTP_429 = "http_429"
+    SLOW_RESPONSE = "slow_response"
+    PARTIAL_RESPONSE = "partial_response"
+    MALFORMED_JSON = "malformed_json"
+
+    ALL_FAULTS = (
+        NETWORK_TIMEOUT, HTTP_5XX, HTTP_429,
+        SLOW_RESPONSE, PARTIAL_RESPONSE, MALFORMED_JSON,
+    )
+
+    def __init__(
+        self,
+        rate: float,
+        faults: Sequence[str] = ALL_FAULTS,
+        seed: Optional[int] = None,
+        slow_seconds: float = 3.0,
+    ):
+        unknown = set(faults) - set(self.ALL_FAULTS)
+        if unknown:
+            raise ValueError(f"Fallas de chaos desconocidas: {sorted(unknown)}")
+
+        self.rate = rate
+        self.faults = tuple(faults)
+        self.slow_seconds = slow_seconds
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def from_env(cls) -> Optional["ChaosMiddleware"]:
+        """Construye el middleware desde el entorno; None si está desactivado."""
+        rate = float(os.getenv("HUBSPOT_CHAOS_RATE", "0") or 0)
+        if rate <= 0:
+            return None
+
+        faults_env = os.getenv("HUBSPOT_CHAOS_FAULTS", "")
+        faults = [f.strip() for f in faults_env.split(",") if f.strip()] or cls.ALL_FAULTS
+        seed_env = os.getenv("CHAOS_SEED")
+        seed = int(seed_env) if seed_env else None
+
+        logger.warning(
+            f"[ChaosMiddleware] ACTIVO: rate={rate}, faults={list(faults)}, seed={seed}"
+        )
+        return cls(rate=rate, faults=faults, seed=seed)
+
+    async def intercept(self, method: str, url: str) -> Optional[httpx.Response]:
+        """
+        Inyecta (o no) una falla para este request.
+
+        Returns:
+            Respuesta sintética que reemplaza la llamada real, o None para
+            continuar con la llamada real.
+
+        Raises:
+            httpx.ReadTimeout: para la falla network_timeout.
+        """
+        if self._rng.random() >= self.rate:
+            return None
+
+        fault = self._rng.choice(self.faults)
+        request = httpx.Request(method, url)
+        logger.warning(f"[ChaosMiddleware] Inyectando {fault} en {method} {url}")
+
+        if fault == self.NETWORK_TIMEOUT:
+            raise httpx.ReadTimeout("Chaos: timeout inyectado", request=request)
+        if fault == self.HTTP_5XX:
+            return httpx.Response(503, text="Chaos: servicio no disponible", request=request)
+        if fault == self.HTTP_429:
+            return httpx.Response(429, headers={"Retry-After": "1"}, request=request)
+        if fault == self.SLOW_RESPONSE:
+            await asyncio.sleep(self.slow_seconds)
+            return None
+        if fault == self.PARTIAL_RESPONSE:
+            return httpx.Response(200, content=b'{"results": [{"id": "1"', request=request)
+        # MALFORMED_JSON
+        return httpx.Response(200, content=b"<html>not json</html>", request=request)
@@ -5,11 +5,17 @@ Monitorea actividad de contactos y actualiza el Deal stage automáticamente.
 """
 
 import os
-from typing import Optional, Dict, Any, List
-from datetime import datetime, timezone, timedelta
+import re
+from typing import Optional, Dict, Any, List, AsyncIterator
 from logging_config import logger
 
 
+# Rutas HubSpot con forma fija: se formatean solo con el ID
+_DEAL_STAGE_URL = "/crm/v3/objects/deals/{}?properties=dealstage"
+_DEAL_UPDATE_URL = "/crm/v3/objects/deals/{}"
+_CONTACT_ENGAGEMENTS_URL = "/crm/v3/objects/contacts/{}/associations/engagements"
+
+
 class DealStageTracker:
     """
     Monitorea actividad en contactos y actualiza etapas de deals automáticamente.
@@ -40,6 +46,10 @@ class DealStageTracker:
         "visita", "agendar", "agendada", "cita", "reunión",
         "ver el inmueble", "conocer la propiedad", "mostrar"
     ]
+    _VISIT_RE = re.compile("|".join(map(re.escape, VISIT_KEYWORDS)), re.IGNORECASE)
+
+    # Tope de páginas de engagements por contacto (evita paginar sin límite)
+    MAX_ACTIVITY_PAGES = 3
 
     def __init__(self, hubspot_client):
         """
@@ -63,28 +73,28 @@ class DealStageTracker:
         try:
             # 1. Obtener etapa actual del deal
             current_stage = await self._get_deal_stage(deal_id)
-            logger.info(f"[DealStageTracker] Deal {deal_id} en etapa: {current_stage}")
+            logger.info("[DealStageTracker] Deal %s en etapa: %s", deal_id, current_stage)
 
             # 2. Solo actualizar si está en "Nuevo Lead"
             if current_stage != self.STAGE_IDS["nuevo_lead"]:
-                logger.debug(f"[DealStageTracker] Deal {deal_id} ya no está en 'Nuevo Lead', omitiendo")
+                logger.debug("[DealStageTracker] Deal %s ya no está en 'Nuevo Lead', omitiendo", deal_id)
                 return None
 
             # 3. Verificar actividades recientes del contacto
-            has_activity = await self._has_recent_activity(contact_id, hours=24)
+            has_activity = await self._has_recent_activity(contact_id)
 
             if has_activity:
                 # Hay actividad → mover a "En Conversación"
                 new_stage = self.STAGE_IDS["en_conversacion"]
                 await self._update_deal_stage(deal_id, new_stage)
-                logger.info(f"[DealStageTracker] ✅ Deal {deal_id} movido: Nuevo Lead → En Conversación")
+                logger.info("[DealStageTracker] ✅ Deal %s movido: Nuevo Lead → En Conversación", deal_id)
                 return new_stage
 
-            logger.debug(f"[DealStageTracker] No hay actividad reciente para deal {deal_id}")
+            logger.debug("[DealStageTracker] No hay actividad reciente para deal %s", deal_id)
             return None
 
         except Exception as e:
-            logger.error(f"[DealStageTracker] Error verificando deal {deal_id}: {e}", exc_info=True)
+            logger.error("[DealStageTracker] Error verificando deal %s: %s", deal_id, e, exc_info=True)
             return None
 
     async def check_for_scheduled_visit(
@@ -102,26 +112,19 @@ class DealStageTracker:
             if current_stage != self.STAGE_IDS["en_conversacion"]:
                 return False
 
-            # Buscar actividades que mencionen visita
-            activities = await self._get_contact_activities(
-                contact_id,
-                activity_types=["NOTE", "EMAIL", "MEETING"],
-                since_hours=48
-            )
-
-            for activity in activities:
-                content = activity.get("body", "").lower()
-                if any(keyword in content for keyword in self.VISIT_KEYWORDS):
+            # Buscar actividades que mencionen visita (corta en el primer match)
+            async for activity in self._iter_contact_activities(contact_id):
+                if self._VISIT_RE.search(activity.get("body") or ""):
                     # Encontramos mención de visita → actualizar
                     new_stage = self.STAGE_IDS["visita_agendada"]
                     await self._update_deal_stage(deal_id, new_stage)
-                    logger.info(f"[DealStageTracker] ✅ Deal {deal_id} movido: En Conversación → Visita Agendada")
+                    logger.info("[DealStageTracker] ✅ Deal %s movido: En Conversación → Visita Agendada", deal_id)
                     return True
 
             return False
 
         except Exception as e:
-            logger.error(f"[DealStageTracker] Error verificando visita para deal {deal_id}: {e}")
+            logger.error("[DealStageTracker] Error verificando visita para deal %s: %s", deal_id, e)
             return False
 
     # ═══════════════════════════════════════════════════════════════════════════
@@ -133,17 +136,14 @@ class DealStageTracker:
         Obtiene la etapa actual de un deal.
         """
         try:
-            endpoint = f"/crm/v3/objects/deals/{deal_id}"
-            params = {"properties": "dealstage"}
-
             # Usar método _request del cliente HubSpot
-            response = await self.hubspot._request("GET", f"{endpoint}?properties=dealstage")
+            response = await self.hubspot._request("GET", _DEAL_STAGE_URL.format(deal_id))
             stage_id = response.get("properties", {}).get("dealstage")
 
             return stage_id
 
         except Exception as e:
-            logger.error(f"[DealStageTracker] Error obteniendo etapa de deal {deal_id}: {e}")
+            logger.error("[DealStageTracker] Error obteniendo etapa de deal %s: %s", deal_id, e)
             return None
 
     async def _update_deal_stage(self, deal_id: str, new_stage_id: str) -> bool:
@@ -151,7 +151,7 @@ class DealStageTracker:
         Actualiza la etapa de un deal.
         """
         try:
-            endpoint = f"/crm/v3/objects/deals/{deal_id}"
+            endpoint = _DEAL_UPDATE_URL.format(deal_id)
             payload = {
                 "properties": {
                     "dealstage": new_stage_id
@@ -159,62 +159,59 @@ class DealStageTracker:
             }
 
             await self.hubspot._request("PATCH", endpoint, payload)
-            logger.info(f"[DealStageTracker] Deal {deal_id} actualizado a etapa {new_stage_id}")
+            logger.info("[DealStageTracker] Deal %s actualizado a etapa %s", deal_id, new_stage_id)
             return True
 
         except Exception as e:
-            logger.error(f"[DealStageTracker] Error actualizando deal {deal_id}: {e}", exc_info=True)
+            logger.error("[DealStageTracker] Error actualizando deal %s: %s", deal_id, e, exc_info=True)
             return False
 
-    async def _has_recent_activity(self, contact_id: str, hours: int = 24) -> bool:
+    async def _has_recent_activity(self, contact_id: str) -> bool:
         """
-        Verifica si un contacto tiene actividad reciente.
+        Verifica si un contacto tiene actividad asociada.
         """
         try:
-            activities = await self._get_contact_activities(
-                contact_id,
-                activity_types=self.ACTIVITY_TYPES_ENGAGEMENT,
-                since_hours=hours
-            )
+            # Basta con la primera actividad: no se descargan más páginas
+            async for _ in self._iter_contact_activities(contact_id, max_pages=1):
+                return True
 
-            return len(activities) > 0
+            return False
 
         except Exception as e:
-            logger.error(f"[DealStageTracker] Error verificando actividad de contacto {contact_id}: {e}")
+            logger.error("[DealStageTracker] Error verificando actividad de contacto %s: %s", contact_id, e)
             return False
 
-    async def _get_contact_activities(
+    async def _iter_contact_activities(
         self,
         contact_id: str,
-        activity_types: List[str],
-        since_hours: int = 24
-    ) -> List[Dict[str, Any]]:
-        """
-        Obtiene actividades recientes de un contacto.
+        max_pages: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
         """
-        try:
-            # Calcular timestamp de inicio
-            since_timestamp = int(
-                (datetime.now(timezone.utc) - timedelta(hours=since_hours)).timestamp() * 1000
-            )
+        Itera las actividades de un contacto página por página.
 
-            # Endpoint de engagements (actividades)
-            endpoint = "/crm/v3/objects/contacts/{}/associations/engagements".format(contact_id)
+        El consumidor puede cortar en cuanto encuentra lo que busca sin pedir
+        las páginas siguientes. El endpoint de asociaciones no filtra por tipo
+        ni por fecha, así que se leen como máximo max_pages páginas
+        (MAX_ACTIVITY_PAGES por defecto).
+        Los errores se propagan al consumidor.
+        """
+        endpoint = _CONTACT_ENGAGEMENTS_URL.format(contact_id)
+        pages_left = max_pages or self.MAX_ACTIVITY_PAGES
+        after = None
 
-            # Nota: HubSpot v3 API tiene limitaciones en filtrado por fecha
-            # Alternativa: usar v1 API o implementar filtrado post-fetch
-            response = await self.hubspot._request("GET", endpoint)
+        while pages_left > 0:
+            page_endpoint = f"{endpoint}?after={after}" if after else endpoint
+            response = await self.hubspot._request("GET", page_endpoint)
+            pages_left -= 1
 
-            # Implementar filtrado por timestamp y tipo
-            # Por ahora retornamos todas las actividades
-            results = response.get("results", [])
+            for activity in response.get("results", []):
+                yield activity
 
-            logger.debug(f"[DealStageTracker] Contacto {contact_id}: {len(results)} actividades encontradas")
-            return results
+            after = ((response.get("paging") or {}).get("next") or {}).get("after")
+            if not after:
+                return
 
-        except Exception as e:
-            logger.error(f"[DealStageTracker] Error obteniendo actividades de {contact_id}: {e}")
-            return []
+        logger.debug("[DealStageTracker] Tope de páginas alcanzado para contacto %s", contact_id)
 
     def get_stage_name(self, stage_id: str) -> str:
         """
@@ -254,8 +251,8 @@ async def auto_update_deal_stages_batch(
             stats["errors"] += 1
 
     logger.info(
-        f"[DealStageTracker] Batch completado: "
-        f"{stats['checked']} verificados, {stats['updated']} actualizados, {stats['errors']} errores"
+        "[DealStageTracker] Batch completado: %d verificados, %d actualizados, %d errores",
+        stats["checked"], stats["updated"], stats["errors"]
     )
 
     return stats
\ No newline at end of file
@@ -5,10 +5,95 @@ Maneja autenticación, retry logic y deduplicación de contactos.
 """
 
 import os
+import copy
+import time
+import asyncio
 import httpx
+import orjson
+from contextlib import contextmanager, asynccontextmanager
+from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, wait_random_exponential, retry_if_exception
 from logging_config import logger
+from .chaos import ChaosMiddleware
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RATE LIMIT (429) - Error tipado + retry que respeta Retry-After
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class HubSpotRateLimitError(httpx.NetworkError):
+    """
+    HubSpot respondió 429. Hereda de NetworkError para que el retry de
+    _request lo siga reintentando; expone el Retry-After si vino en la respuesta.
+    """
+
+    def __init__(self, message: str, request: httpx.Request, retry_after: Optional[float] = None):
+        super().__init__(message, request=request)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """Lee el header Retry-After (en segundos). Retorna None si no existe o no es numérico."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+def _wait_retry_after(fallback):
+    """
+    Estrategia de espera para tenacity: usa el Retry-After indicado por HubSpot
+    cuando el error lo trae; si no, delega en la estrategia `fallback`.
+    """
+    def _wait(retry_state) -> float:
+        exc = retry_state.outcome.exception()
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after is not None:
+            return retry_after
+        return fallback(retry_state)
+    return _wait
+
+
+def _is_retryable_error(exc: BaseException) -> bool:
+    """Timeouts, errores de red (incluye 429) y 5xx se reintentan; 4xx no."""
+    if isinstance(exc, (httpx.TimeoutException, httpx.NetworkError)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return False
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket asíncrono para pacing client-side.
+
+    Se recargan `rate` tokens por segundo hasta `capacity`; cada request
+    consume uno. Si no hay tokens, el caller espera lo justo para el siguiente.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self._rate)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -99,11 +184,199 @@ class HubSpotPropertyValidator:
         return filtered, removed
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# CIRCUIT BREAKER - Fallar rápido cuando un endpoint de HubSpot está caído
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class CircuitOpenError(Exception):
+    """El circuito del endpoint está abierto: se falla sin llamar a HubSpot."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker CLOSED → OPEN → HALF_OPEN.
+
+    Tras `failure_threshold` fallos consecutivos (timeouts, red, 5xx) el
+    circuito se abre y rechaza llamadas durante `reset_timeout` segundos.
+    Luego deja pasar una sola llamada de prueba: si funciona se cierra,
+    si falla se vuelve a abrir. Las respuestas 4xx no cuentan como fallo.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @contextmanager
+    def guard(self):
+        """Envuelve una llamada: rechaza si está abierto y registra el resultado."""
+        self._before_call()
+        try:
+            yield
+        except Exception as e:
+            if _is_retryable_error(e) and not isinstance(e, HubSpotRateLimitError):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelación (p.ej. asyncio.wait_for): la llamada no prueba nada,
+            # pero hay que liberar la prueba o el circuito queda trabado
+            self._probe_in_flight = False
+            raise
+        else:
+            self.record_success()
+
+    def _before_call(self) -> None:
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"Circuito abierto para {self.name}")
+            self.state = self.HALF_OPEN
+
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                raise CircuitOpenError(f"Circuito en prueba para {self.name}")
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"[CircuitBreaker] {self.name} recuperado, circuito cerrado")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(
+                    f"[CircuitBreaker] {self.name} abierto tras {self._failures} fallos "
+                    f"(reintento en {self.reset_timeout}s)"
+                )
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class BulkheadFullError(Exception):
+    """Demasiadas llamadas a HubSpot en cola: se rechaza en lugar de acumular coroutines."""
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BATCH READER - Agrupa búsquedas concurrentes por whatsapp_id en un solo request
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ContactBatchReader:
+    """
+    Coalesce búsquedas de contactos por whatsapp_id.
+
+    Las búsquedas que llegan dentro de una ventana corta (20ms por defecto) se
+    envían juntas a /crm/v3/objects/contacts/batch/read (máx 100 inputs por
+    request) y cada coroutine recibe su resultado vía un asyncio.Future.
+    """
+
+    ENDPOINT = "/crm/v3/objects/contacts/batch/read"
+    MAX_BATCH_SIZE = 100
+
+    # Partes constantes del payload; solo "inputs" cambia por batch
+    _PAYLOAD_TEMPLATE = {
+        "properties": ("id", "firstname", "whatsapp_id"),
+        "idProperty": "whatsapp_id",
+    }
+
+    def __init__(self, client: "HubSpotClient", window: float = 0.02):
+        self._client = client
+        self._window = window
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.Task] = None
+
+    async def lookup(self, phone: str) -> Optional[str]:
+        """Retorna el contact_id asociado al whatsapp_id o None si no existe."""
+        future = self._pending.get(phone)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[phone] = future
+            if self._timer is None:
+                self._timer = asyncio.create_task(self._flush_after_window())
+        # shield: si un caller se cancela no se cancela el future compartido
+        return await asyncio.shield(future)
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self._window)
+        pending, self._pending = self._pending, {}
+        self._timer = None
+
+        phones = list(pending)
+        for start in range(0, len(phones), self.MAX_BATCH_SIZE):
+            chunk = phones[start:start + self.MAX_BATCH_SIZE]
+            try:
+                found = await self._read_batch(chunk)
+            except Exception as e:
+                for phone in chunk:
+                    if not pending[phone].done():
+                        pending[phone].set_exception(e)
+                continue
+            for phone in chunk:
+                if not pending[phone].done():
+                    pending[phone].set_result(found.get(phone))
+
+    async def _read_batch(self, phones: List[str]) -> Dict[str, str]:
+        """Ejecuta un batch/read y retorna {whatsapp_id: contact_id}."""
+        payload = {**self._PAYLOAD_TEMPLATE, "inputs": [{"id": phone} for phone in phones]}
+        response = await self._client._request("POST", self.ENDPOINT, payload)
+
+        found = {}
+        for result in response.get("results", []):
+            whatsapp_id = (result.get("properties") or {}).get("whatsapp_id")
+            if whatsapp_id is None and len(phones) == 1:
+                whatsapp_id = phones[0]
+            if whatsapp_id is not None:
+                found[whatsapp_id] = result["id"]
+        return found
+
+
 class HubSpotClient:
     """
     Cliente asíncrono para interactuar con HubSpot CRM API v3.
     """
 
+    # Máximo de inputs por request en endpoints batch de HubSpot
+    BATCH_MAX_INPUTS = 100
+
+    # Partes constantes de los payloads de búsqueda (solo cambian inputs/filtros)
+    _CHATBOT_PAYLOAD_TEMPLATE = {
+        "properties": (
+            "id", "firstname", "lastname", "email",
+            # Owner del contacto (para verificar si ya está asignado)
+            "hubspot_owner_id",
+            # Propiedades del chatbot
+            "chatbot_property_type",
+            "chatbot_operation_type",
+            "chatbot_location",
+            "chatbot_budget",
+            "chatbot_preference",
+            "chatbot_score",
+            "chatbot_rooms",
+            "chatbot_conversation",
+            "chatbot_timestamp",
+            "canal_origen",
+        ),
+        "idProperty": "whatsapp_id",
+    }
+    _EMAIL_SEARCH_PROPERTIES = ("id", "firstname", "lastname")
+
+    # Caché en memoria de búsquedas por email (TTL en segundos, máx entradas)
+    EMAIL_CACHE_TTL = 60
+    EMAIL_CACHE_MAXSIZE = 2048
+
     def __init__(self):
         """
         Inicializa el cliente HubSpot.
@@ -126,40 +399,109 @@ class HubSpotClient:
             "Content-Type": "application/json"
         }
 
-        # Cliente HTTP persistente con connection pooling (evita TCP/TLS overhead por request)
+        # Bulkhead: máximo de llamadas concurrentes a HubSpot + cola acotada.
+        # Ante una ráfaga de webhooks el exceso falla rápido (BulkheadFullError).
+        self._bulkhead_capacity = int(os.getenv("HUBSPOT_BULKHEAD_CAPACITY", "20"))
+        self._bulkhead_max_waiters = int(os.getenv("HUBSPOT_BULKHEAD_QUEUE", "100"))
+        self._bulkhead = asyncio.Semaphore(self._bulkhead_capacity)
+        self._bulkhead_waiters = 0
+        self.bulkhead_rejections = 0
+
+        # Cliente HTTP persistente con connection pooling (evita TCP/TLS overhead por request).
+        # base_url y headers quedan ligados al cliente: no se reconstruyen por llamada.
+        # El pool se dimensiona al bulkhead: cada slot en curso tiene su conexión
+        # y la mitad se mantiene viva para no repetir handshakes TLS en ráfagas.
         self._http_client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
             timeout=15.0,
-            limits=httpx.Limits(max_keepalive_connections=5, max_connections=10, keepalive_expiry=30.0)
+            limits=httpx.Limits(
+                max_connections=self._bulkhead_capacity,
+                max_keepalive_connections=max(self._bulkhead_capacity // 2, 1),
+                keepalive_expiry=30.0
+            )
+        )
+
+        # Pacing client-side: HubSpot permite ~10 req/s por app privada
+        rate_limit = float(os.getenv("HUBSPOT_RATE_LIMIT_PER_SEC", "10"))
+        self._bucket = AsyncTokenBucket(rate=rate_limit, capacity=max(int(rate_limit), 1))
+        # Los endpoints /search tienen un límite propio más bajo (~4 req/s)
+        search_rate_limit = float(os.getenv("HUBSPOT_SEARCH_RATE_LIMIT_PER_SEC", "4"))
+        self._search_bucket = AsyncTokenBucket(
+            rate=search_rate_limit, capacity=max(int(search_rate_limit), 1)
         )
 
+        # {email_normalizado: (timestamp_monotonic, resultado)}
+        self._email_cache: Dict[str, tuple[float, Dict[str, Any]]] = {}
+
+        # Un circuit breaker por recurso (/crm/v3/objects/{recurso}): un endpoint
+        # caído no bloquea a los demás
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+        # Inyección de fallas para pruebas de resiliencia (desactivado salvo por env)
+        self._chaos: Optional[ChaosMiddleware] = ChaosMiddleware.from_env()
+
+        # Búsquedas por whatsapp_id agrupadas en batch/read
+        self._batch_reader = ContactBatchReader(self)
+
         logger.info("[HubSpotClient] Inicializado correctamente")
 
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=15),
-        retry=retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError, httpx.ConnectError))
+        # 429 → espera el Retry-After de HubSpot; resto → full jitter
+        wait=_wait_retry_after(wait_random_exponential(multiplier=1, max=15)),
+        retry=retry_if_exception(_is_retryable_error),
+        reraise=True
     )
-    async def _request(self, method: str, endpoint: str, json_data: Optional[dict] = None) -> Dict[str, Any]:
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        json_data: Optional[dict] = None,
+        parse_json: bool = True
+    ) -> Dict[str, Any]:
         """
-        Wrapper interno para requests HTTP con retry logic.
+        Wrapper interno para requests HTTP: bulkhead, rate limiting, circuit breaker y retry.
+
+        Con parse_json=False no se decodifica el body (escrituras cuya respuesta
+        no se usa) y se retorna {} igual que en un 204.
         """
-        url = f"{self.base_url}{endpoint}"
-        client = self._http_client
-        try:
-            response = await client.request(method, url, headers=self.headers, json=json_data)
-            response.raise_for_status()
+        breaker = self._get_breaker(endpoint)
 
-            # Si es 204 No Content, retornar vacío
-            if response.status_code == 204:
+        try:
+            # Pacing antes del bulkhead: una ráfaga de /search esperando tokens
+            # no debe ocupar los slots que necesitan las demás llamadas
+            if endpoint.endswith("/search"):
+                await self._search_bucket.acquire()
+            await self._bucket.acquire()
+
+            async with self._bulkhead_slot():
+                with breaker.guard():
+                    response = None
+                    if self._chaos:
+                        response = await self._chaos.intercept(method, f"{self.base_url}{endpoint}")
+                    if response is None:
+                        # orjson serializa en C; Content-Type ya viene en los headers del cliente
+                        content = orjson.dumps(json_data) if json_data is not None else None
+                        response = await self._http_client.request(method, endpoint, content=content)
+                    response.raise_for_status()
+
+            # Si es 204 No Content (o no se necesita el body), retornar vacío
+            if response.status_code == 204 or not parse_json:
                 return {}
 
-            return response.json()
+            # orjson parsea directo desde bytes (sin decodificar a str primero)
+            return orjson.loads(response.content)
 
         except httpx.HTTPStatusError as e:
-            # Rate limit (429): Convertir a NetworkError para forzar retry
+            # Rate limit (429): Error tipado (subclase de NetworkError) para forzar retry
             if e.response.status_code == 429:
                 logger.warning("[HubSpotClient] Rate limit alcanzado (429), reintentando...")
-                raise httpx.NetworkError("Rate Limit Exceeded", request=e.request)
+                raise HubSpotRateLimitError(
+                    "Rate Limit Exceeded",
+                    request=e.request,
+                    retry_after=_parse_retry_after(e.response),
+                )
 
             # Errores de cliente (4xx): NO reintentar
             if 400 <= e.response.status_code < 500:
@@ -170,23 +512,52 @@ class HubSpotClient:
             logger.error(f"[HubSpotClient] Server Error {e.response.status_code}: {e.response.text}")
             raise e
 
+    @asynccontextmanager
+    async def _bulkhead_slot(self):
+        """Ocupa un slot del bulkhead; rechaza si la cola de espera está llena."""
+        if self._bulkhead.locked() and self._bulkhead_waiters >= self._bulkhead_max_waiters:
+            self.bulkhead_rejections += 1
+            logger.warning(
+                f"[HubSpotClient] Bulkhead lleno ({self._bulkhead_capacity} en curso, "
+                f"{self._bulkhead_waiters} en cola), request rechazado "
+                f"(total rechazados: {self.bulkhead_rejections})"
+            )
+            raise BulkheadFullError("Demasiadas llamadas concurrentes a HubSpot")
+
+        self._bulkhead_waiters += 1
+        try:
+            await self._bulkhead.acquire()
+        finally:
+            self._bulkhead_waiters -= 1
+
+        try:
+            yield
+        finally:
+            self._bulkhead.release()
+
+    def _get_breaker(self, endpoint: str) -> CircuitBreaker:
+        """Retorna el circuit breaker del recurso (primeros 4 segmentos del path)."""
+        key = "/".join(endpoint.split("?", 1)[0].split("/")[:5])
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(key)
+        return breaker
+
+    async def aclose(self) -> None:
+        """Cierra el pool de conexiones HTTP. Llamar en el shutdown de la app."""
+        await self._http_client.aclose()
+        logger.info("[HubSpotClient] Cliente HTTP cerrado")
+
     async def search_contact_by_phone(self, phone: str) -> Optional[str]:
         """
         Busca ID de contacto usando whatsapp_id como identificador único.
-        """
-        endpoint = "/crm/v3/objects/contacts/batch/read"
-        payload = {
-            "properties": ["id", "firstname"],
-            "idProperty": "whatsapp_id",
-            "inputs": [{"id": phone}]
-        }
 
+        Las búsquedas concurrentes se agrupan en un solo batch/read (ver ContactBatchReader).
+        """
         try:
-            response = await self._request("POST", endpoint, payload)
-            results = response.get("results", [])
+            contact_id = await self._batch_reader.lookup(phone)
 
-            if results:
-                contact_id = results[0]["id"]
+            if contact_id:
                 logger.info(f"[HubSpotClient] Contacto encontrado: {contact_id} (whatsapp_id: {phone})")
                 return contact_id
 
@@ -206,26 +577,7 @@ class HubSpotClient:
         """
         endpoint = "/crm/v3/objects/contacts/batch/read"
         # Obtener todas las propiedades relevantes para el chatbot
-        payload = {
-            "properties": [
-                "id", "firstname", "lastname", "email",
-                # Owner del contacto (para verificar si ya está asignado)
-                "hubspot_owner_id",
-                # Propiedades del chatbot
-                "chatbot_property_type",
-                "chatbot_operation_type", 
-                "chatbot_location",
-                "chatbot_budget",
-                "chatbot_preference",
-                "chatbot_score",
-                "chatbot_rooms",
-                "chatbot_conversation",
-                "chatbot_timestamp",
-                "canal_origen",
-            ],
-            "idProperty": "whatsapp_id",
-            "inputs": [{"id": phone}]
-        }
+        payload = {**self._CHATBOT_PAYLOAD_TEMPLATE, "inputs": [{"id": phone}]}
 
         try:
             response = await self._request("POST", endpoint, payload)
@@ -297,32 +649,49 @@ class HubSpotClient:
         """
         Busca contactos por email usando la API de búsqueda.
         Retorna el resultado completo de la búsqueda.
+
+        Los resultados se cachean en memoria EMAIL_CACHE_TTL segundos por email
+        normalizado (las búsquedas repetidas no consumen cuota de /search).
+        Solo se cachean búsquedas con resultados (un contacto recién creado debe
+        encontrarse en la siguiente llamada) y cada llamada recibe su propia copia.
         """
+        email = email.strip().lower()
+
+        cached = self._email_cache.get(email)
+        if cached is not None:
+            cached_at, cached_response = cached
+            if time.monotonic() - cached_at < self.EMAIL_CACHE_TTL:
+                logger.debug(f"[HubSpotClient] Cache HIT búsqueda por email '{email}'")
+                return copy.deepcopy(cached_response)
+            del self._email_cache[email]
+
         endpoint = "/crm/v3/objects/contacts/search"
         payload = {
             "filterGroups": [
-                {
-                    "filters": [
-                        {
-                            "propertyName": "email",
-                            "operator": "EQ",
-                            "value": email
-                        }
-                    ]
-                }
+                {"filters": [{"propertyName": "email", "operator": "EQ", "value": email}]}
             ],
-            "properties": ["id", "firstname", "lastname"]
+            "properties": self._EMAIL_SEARCH_PROPERTIES
         }
 
         try:
             response = await self._request("POST", endpoint, payload)
             logger.info(f"[HubSpotClient] Búsqueda por email '{email}' ejecutada correctamente")
+
+            if response.get("results"):
+                if len(self._email_cache) >= self.EMAIL_CACHE_MAXSIZE:
+                    # Desalojar la entrada más antigua (orden de inserción)
+                    self._email_cache.pop(next(iter(self._email_cache)))
+                self._email_cache[email] = (time.monotonic(), copy.deepcopy(response))
             return response
 
         except Exception as e:
             logger.error(f"[HubSpotClient] Error buscando contactos por email: {e}", exc_info=True)
             raise
 
+    def clear_cache(self) -> None:
+        """Vacía la caché de búsquedas por email (útil en tests)."""
+        self._email_cache.clear()
+
     async def create_contact(self, properties: Dict[str, Any]) -> str:
         """
         Crea un nuevo contacto en HubSpot.
@@ -359,7 +728,7 @@ class HubSpotClient:
             )
             return
         
-        await self._request("PATCH", endpoint, {"properties": validated_props})
+        await self._request("PATCH", endpoint, {"properties": validated_props}, parse_json=False)
         logger.info(f"[HubSpotClient] Contacto actualizado: {contact_id}")
 
 
@@ -407,34 +776,32 @@ class HubSpotClient:
         ya que los deals tienen su propio esquema de propiedades personalizadas.
         """
         endpoint = f"/crm/v3/objects/deals/{deal_id}"
-        await self._request("PATCH", endpoint, {"properties": properties})
+        await self._request("PATCH", endpoint, {"properties": properties}, parse_json=False)
         logger.info(f"[HubSpotClient] Deal actualizado: {deal_id}")
 
-    async def create_note(
-        self,
+    @staticmethod
+    def _build_note_input(
         contact_id: str,
         body: str,
         owner_id: Optional[str] = None,
         timestamp: Optional[str] = None
-    ) -> str:
+    ) -> Dict[str, Any]:
         """
-        Crea una nota en HubSpot y la asocia a un contacto.
+        Construye el objeto nota (propiedades + asociación al contacto).
+        Compartido por create_note y create_notes_batch.
         """
-        from datetime import datetime, timezone
-
-        endpoint = "/crm/v3/objects/notes"
-
         # Preparar propiedades de la nota
         properties = {
             "hs_note_body": body,
-            "hs_timestamp": timestamp or datetime.now(timezone.utc).isoformat()
+            # HubSpot ignora los microsegundos: timespec="seconds" evita formatearlos
+            "hs_timestamp": timestamp or datetime.now(timezone.utc).isoformat(timespec="seconds")
         }
 
         # Agregar owner si se proporciona
         if owner_id:
             properties["hubspot_owner_id"] = owner_id
 
-        payload = {
+        return {
             "properties": properties,
             "associations": [
                 {
@@ -449,6 +816,19 @@ class HubSpotClient:
             ]
         }
 
+    async def create_note(
+        self,
+        contact_id: str,
+        body: str,
+        owner_id: Optional[str] = None,
+        timestamp: Optional[str] = None
+    ) -> str:
+        """
+        Crea una nota en HubSpot y la asocia a un contacto.
+        """
+        endpoint = "/crm/v3/objects/notes"
+        payload = self._build_note_input(contact_id, body, owner_id, timestamp)
+
         try:
             response = await self._request("POST", endpoint, payload)
             note_id = response.get("id")
@@ -459,6 +839,47 @@ class HubSpotClient:
             logger.error(f"[HubSpotClient] Error creando nota para contacto {contact_id}: {e}")
             raise
 
+    async def create_notes_batch(self, notes: List[Dict[str, Any]]) -> List[str]:
+        """
+        Crea varias notas usando /crm/v3/objects/notes/batch/create (hasta 100 por request).
+
+        Args:
+            notes: Lista de dicts con 'contact_id' y 'body' (opcionales: 'owner_id', 'timestamp')
+
+        Returns:
+            IDs de las notas creadas
+        """
+        endpoint = "/crm/v3/objects/notes/batch/create"
+        note_ids: List[str] = []
+
+        for start in range(0, len(notes), self.BATCH_MAX_INPUTS):
+            chunk = notes[start:start + self.BATCH_MAX_INPUTS]
+            payload = {
+                "inputs": [
+                    self._build_note_input(
+                        note["contact_id"],
+                        note["body"],
+                        note.get("owner_id"),
+                        note.get("timestamp"),
+                    )
+                    for note in chunk
+                ]
+            }
+
+            try:
+                response = await self._request("POST", endpoint, payload)
+            except Exception as e:
+                logger.error(
+                    f"[HubSpotClient] Error creando batch de {len(chunk)} notas "
+                    f"({len(note_ids)} creadas antes del error): {e}"
+                )
+                raise
+
+            note_ids.extend(result["id"] for result in response.get("results", []))
+
+        logger.info(f"[HubSpotClient] Batch de notas creado: {len(note_ids)} notas")
+        return note_ids
+
     async def get_contact(self, contact_id: str, properties: Optional[list] = None) -> Dict[str, Any]:
         """
         Obtiene los datos de un contacto por su ID.
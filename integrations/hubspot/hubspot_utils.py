@@ -4,9 +4,18 @@ Utilidades para normalización y procesamiento de datos de HubSpot.
 Funciones puras sin dependencias externas (fáciles de testear).
 """
 
-import re
-from typing import Dict, Any, Optional
+import logging
+from collections import deque
+from collections.abc import Sequence
+from typing import Dict, Any, Iterable, Optional
 from logging_config import logger
+from utils.channels_registry import get_score_bonuses
+
+_DEBUG = logging.DEBUG
+
+# Tabla para eliminar caracteres de formato del teléfono (espacios, guiones, paréntesis)
+_PHONE_STRIP_TABLE = str.maketrans("", "", " -()")
+
 
 def normalize_phone_e164(phone: str) -> str:
     """
@@ -21,7 +30,7 @@ def normalize_phone_e164(phone: str) -> str:
     clean_phone = phone.replace("whatsapp:", "").strip()
 
     # 2. Eliminar espacios, guiones y paréntesis
-    clean_phone = re.sub(r"[ \-\(\)]", "", clean_phone)
+    clean_phone = clean_phone.translate(_PHONE_STRIP_TABLE)
 
     # 3. Asegurar que empiece con '+'
     if not clean_phone.startswith("+"):
@@ -30,9 +39,18 @@ def normalize_phone_e164(phone: str) -> str:
     return clean_phone
 
 
-from utils.channels_registry import get_score_bonuses
-
+# Bonus por canal: fuente única en utils/channels_registry.py
 CHANNEL_SCORE_BONUS = get_score_bonuses()
+_channel_bonus = CHANNEL_SCORE_BONUS.get
+
+# Puntos por campo presente: (clave, puntos)
+_LEAD_FLAGS = (("phone", 20),)
+_META_POINTS = (
+    ("tipo_propiedad", 15),
+    ("ubicacion", 15),
+    ("presupuesto", 15),
+    ("caracteristicas", 15),  # Habitaciones, área, etc.
+)
 
 
 def calculate_lead_score(lead_data: Dict[str, Any]) -> int:
@@ -51,7 +69,13 @@ def calculate_lead_score(lead_data: Dict[str, Any]) -> int:
     - Bonus por código de inmueble: +20 puntos (alta intención)
     - Bonus por llegada con link de inmueble: +15 puntos
     """
-    score = 0
+    metadata = lead_data.get("metadata", {})
+
+    # Teléfono (obligatorio) + metadata de propiedad
+    score = (
+        sum(pts for key, pts in _LEAD_FLAGS if lead_data.get(key))
+        + sum(pts for key, pts in _META_POINTS if metadata.get(key))
+    )
 
     # Nombre completo (firstname + lastname)
     if lead_data.get("firstname") and lead_data.get("lastname"):
@@ -59,46 +83,33 @@ def calculate_lead_score(lead_data: Dict[str, Any]) -> int:
     elif lead_data.get("firstname"):
         score += 10  # Solo nombre
 
-    # Teléfono (obligatorio, siempre debe existir)
-    if lead_data.get("phone"):
-        score += 20
-
-    # Metadata de propiedad
-    metadata = lead_data.get("metadata", {})
-
-    if metadata.get("tipo_propiedad"):
-        score += 15
-
-    if metadata.get("ubicacion"):
-        score += 15
-
-    if metadata.get("presupuesto"):
-        score += 15
-
-    # Características adicionales (habitaciones, área, etc.)
-    if metadata.get("caracteristicas"):
-        score += 15
-
     # BONUS por canal de origen (leads de portales tienen mayor intención)
     canal_origen = lead_data.get("canal_origen", "desconocido")
-    channel_bonus = CHANNEL_SCORE_BONUS.get(canal_origen, 0)
+    channel_bonus = _channel_bonus(canal_origen, 0)
     score += channel_bonus
 
+    debug_enabled = logger.isEnabledFor(_DEBUG)
+
     # BONUS si tiene código de inmueble (alta intención de ver propiedad específica)
     if lead_data.get("property_code") or metadata.get("property_code"):
         score += 20
-        logger.debug(f"[HubSpotUtils] +20 puntos por código de inmueble")
+        if debug_enabled:
+            logger.debug("[HubSpotUtils] +20 puntos por código de inmueble")
 
     # BONUS si llegó con link de inmueble específico
     if lead_data.get("llegada_por_link") and lead_data.get("es_inmueble"):
         score += 15
-        logger.debug(f"[HubSpotUtils] +15 puntos por llegada con link de inmueble")
+        if debug_enabled:
+            logger.debug("[HubSpotUtils] +15 puntos por llegada con link de inmueble")
 
-    logger.debug(
-        f"[HubSpotUtils] Lead score calculado: {min(score, 100)}/100 "
-        f"(canal: {canal_origen}, bonus canal: +{channel_bonus})"
-    )
-    return min(score, 100)  # Cap en 100
+    score = min(score, 100)  # Cap en 100
+
+    if debug_enabled:
+        logger.debug(
+            "[HubSpotUtils] Lead score calculado: %d/100 (canal: %s, bonus canal: +%d)",
+            score, canal_origen, channel_bonus
+        )
+    return score
 
 
 def parse_budget_to_number(budget_str: str) -> int:
@@ -145,7 +156,12 @@ def split_full_name(full_name: str) -> Dict[str, str]:
     """
     Divide un nombre completo en firstname y lastname.
     """
-    parts = full_name.strip().split(maxsplit=1)
+    # split() ya ignora el espacio inicial; solo hace falta strip() si el
+    # último carácter es espacio (quedaría pegado al lastname)
+    if full_name and not full_name[-1].isspace():
+        parts = full_name.split(maxsplit=1)
+    else:
+        parts = full_name.strip().split(maxsplit=1)
 
     if len(parts) == 2:
         return {"firstname": parts[0], "lastname": parts[1]}
@@ -155,15 +171,26 @@ def split_full_name(full_name: str) -> Dict[str, str]:
         return {"firstname": full_name, "lastname": ""}
 
 
-def format_conversation_history(history: list) -> str:
+# Últimos N mensajes que se guardan en HubSpot (evita exceder límites de API)
+HISTORY_MAX_MESSAGES = 20
+
+
+def format_conversation_history(history: Iterable[str]) -> str:
     """
     Formatea el historial de conversación para almacenar en HubSpot.
+
+    Acepta cualquier iterable de mensajes y se queda con los últimos
+    HISTORY_MAX_MESSAGES: las secuencias se cortan con un slice (solo copia
+    la cola), y los iteradores (p.ej. itertools.chain) pasan por un
+    deque(maxlen=HISTORY_MAX_MESSAGES) de memoria acotada.
     """
     if not history:
         return ""
 
-    # Limitar a últimos 20 mensajes para evitar exceder límites de API
-    limited_history = history[-20:] if len(history) > 20 else history
+    if isinstance(history, Sequence):
+        limited_history = history[-HISTORY_MAX_MESSAGES:]
+    else:
+        limited_history = deque(history, maxlen=HISTORY_MAX_MESSAGES)
 
     return "\n".join(limited_history)
 
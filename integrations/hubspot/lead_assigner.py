@@ -5,12 +5,42 @@ Soporta múltiples canales y equipos con persistencia en Redis.
 """
 
 import os
+import re
+import asyncio
+import time
+import threading
+import orjson
 import redis
-from typing import Optional, Dict, List, Any
+import redis.asyncio as aioredis
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Optional, Dict, List, Any, Tuple
 from logging_config import logger
 from datetime import datetime, timezone, timedelta
 
 
+# Detección de canal por referrer: una sola pasada con regex.
+# Cada patrón mapea a (prioridad, canal); si aparecen varios gana la menor
+# prioridad, igual que el orden del antiguo if/elif.
+_REFERRER_RE = re.compile(r"fincaraiz|finca raiz|metrocuadrado|facebook|fb\.com|instagram|google")
+_REFERRER_CHANNELS = {
+    "fincaraiz": (0, "finca_raiz"),
+    "finca raiz": (0, "finca_raiz"),
+    "metrocuadrado": (1, "metrocuadrado"),
+    "facebook": (2, "facebook"),
+    "fb.com": (2, "facebook"),
+    "instagram": (3, "instagram"),
+    "google": (4, "google_ads"),
+}
+
+# INCR + módulo en el servidor: atómico y en un solo round-trip (EVALSHA).
+# La key sigue guardando el contador crudo, igual que con INCR directo.
+_NEXT_INDEX_LUA = """
+local v = redis.call('INCR', KEYS[1])
+return (v - 1) % tonumber(ARGV[1])
+"""
+
+
 class LeadAssigner:
     """
     Asignador de leads por Round Robin con soporte para múltiples canales.
@@ -51,29 +81,87 @@ class LeadAssigner:
         ],
     }
 
-    # Mapeo canal → equipo (generado desde channels_registry.py)
+    # Mapeo canal → equipo (generado desde channels_registry.py).
+    # Solo lectura: los caches de __init__ asumen que no cambian en runtime.
     from utils.channels_registry import get_channel_to_team, get_channel_to_owner, get_social_media_channels
-    CHANNEL_TO_TEAM = get_channel_to_team()
-    CHANNEL_TO_OWNER = get_channel_to_owner()
-    SOCIAL_MEDIA_CHANNELS = get_social_media_channels()
+    CHANNEL_TO_TEAM = MappingProxyType(get_channel_to_team())
+    CHANNEL_TO_OWNER = MappingProxyType(get_channel_to_owner())
+    SOCIAL_MEDIA_CHANNELS = tuple(get_social_media_channels())
 
     # Prefijo para claves de Redis
     REDIS_KEY_PREFIX = "lead_assigner"
 
+    # Segundos entre intentos de reconexión mientras Redis está caído
+    REDIS_RETRY_INTERVAL = 30.0
+
+    # Segundos que se reutilizan las estadísticas (polling de dashboards/health checks)
+    STATS_CACHE_TTL = 1.0
+
     def __init__(self, redis_client: Optional[redis.Redis] = None):
         """
         Inicializa el asignador con cliente Redis opcional.
+
+        Sin cliente, la conexión a Redis se difiere al primer uso: importar el
+        módulo no abre sockets ni bloquea el arranque del worker.
         """
         self.redis = redis_client
         self._redis_available = False
+        self._redis_retry_at = 0.0
+        self._redis_initialized = redis_client is not None
+        self._owns_redis = False
+        self._init_lock = threading.Lock()
+        self._next_index_script = None
+
+        # Contador local por equipo: mantiene la rotación mientras Redis no responde
+        self._local_indices: Dict[str, int] = defaultdict(int)
+        self._local_lock = threading.Lock()
+
+        # (timestamp monotonic, stats) de la última lectura de get_assignment_stats
+        self._stats_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+
+        # OWNERS_CONFIG no cambia en runtime: owners activos precalculados por equipo
+        self._active_owners: Dict[str, Tuple[Dict[str, Any], ...]] = {
+            team: tuple(o for o in owners if o.get("active", True))
+            for team, owners in self.OWNERS_CONFIG.items()
+        }
+        # Vista por columnas para la rotación: tuplas paralelas de IDs y nombres
+        # por equipo, así get_next_owner indexa tuplas en lugar de dicts.
+        self._active_owner_ids: Dict[str, Tuple[str, ...]] = {
+            team: tuple(o["id"] for o in owners) for team, owners in self._active_owners.items()
+        }
+        self._active_owner_names: Dict[str, Tuple[str, ...]] = {
+            team: tuple(o["name"] for o in owners) for team, owners in self._active_owners.items()
+        }
+        # Índice {owner_id: nombre}; ante IDs repetidos gana el primero (como el scan original)
+        self._owner_names: Dict[str, str] = {}
+        for owners in self.OWNERS_CONFIG.values():
+            for owner in owners:
+                self._owner_names.setdefault(owner["id"], owner["name"])
+
+        # Claves de Redis por equipo precalculadas (conjunto cerrado de equipos)
+        self._redis_keys: Dict[str, str] = {
+            team: f"{self.REDIS_KEY_PREFIX}:index:{team}" for team in self.OWNERS_CONFIG
+        }
 
-        # Intentar conectar a Redis si no se proporciona cliente
-        if self.redis is None:
-            self._init_redis()
-        else:
+        # Equipos con un único owner activo: se asignan sin tocar Redis
+        self._singleton_owner: Dict[str, str] = {
+            team: owners[0]["id"]
+            for team, owners in self._active_owners.items()
+            if len(owners) == 1
+        }
+
+        if self.redis is not None:
+            self._register_scripts()
             self._redis_available = True
 
-        logger.info(f"[LeadAssigner] Inicializado. Redis disponible: {self._redis_available}")
+        logger.info(
+            "[LeadAssigner] Inicializado. Redis: %s",
+            "cliente inyectado" if self._redis_initialized else "conexión diferida al primer uso"
+        )
+
+    def _register_scripts(self):
+        """register_script no hace I/O: calcula el SHA y usa EVALSHA con fallback a EVAL."""
+        self._next_index_script = self.redis.register_script(_NEXT_INDEX_LUA)
 
     def _init_redis(self):
         """Inicializa conexión a Redis de forma segura."""
@@ -85,14 +173,22 @@ class LeadAssigner:
             )
 
             if redis_url:
-                self.redis = redis.from_url(
+                # Pool explícito: get_next_owner corre en asyncio.to_thread, así que
+                # varias asignaciones concurrentes necesitan conexiones propias.
+                # Las conexiones se abren bajo demanda; el cap evita un pool sin límite.
+                pool = redis.ConnectionPool.from_url(
                     redis_url,
                     decode_responses=True,
-                    max_connections=3,           # Cap explícito — evita pool sin límite
+                    max_connections=int(os.getenv("LEAD_ASSIGNER_REDIS_POOL_SIZE", "10")),
                     socket_timeout=3.0,
                     socket_connect_timeout=3.0,
+                    socket_keepalive=True,
+                    health_check_interval=30,
                     retry_on_timeout=True
                 )
+                self.redis = redis.Redis(connection_pool=pool)
+                self._owns_redis = True
+                self._register_scripts()
                 self.redis.ping()
                 self._redis_available = True
                 logger.info("[LeadAssigner] Conexión a Redis establecida")
@@ -102,23 +198,74 @@ class LeadAssigner:
         except Exception as e:
             logger.warning(f"[LeadAssigner] No se pudo conectar a Redis: {e}. Usando asignación sin persistencia.")
             self._redis_available = False
+            self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_INTERVAL
+
+    def close(self):
+        """
+        Cierra el pool de Redis propio (llamado en el shutdown de la app).
+
+        Un cliente inyectado pertenece a quien lo creó y no se toca.
+        """
+        if self.redis is None or not self._owns_redis:
+            return
+        try:
+            self.redis.connection_pool.disconnect()
+            logger.info("[LeadAssigner] Pool de Redis cerrado")
+        except Exception as e:
+            logger.warning(f"[LeadAssigner] Error cerrando pool de Redis: {e}")
+        finally:
+            self._redis_available = False
+
+    def _redis_ready(self) -> bool:
+        """
+        Indica si se puede usar Redis. Tras una caída reintenta un PING como
+        máximo cada REDIS_RETRY_INTERVAL segundos para no pagar el timeout
+        del socket en cada asignación.
+        """
+        if self._redis_available:
+            return True
+        if not self._redis_initialized:
+            with self._init_lock:
+                if not self._redis_initialized:
+                    self._init_redis()
+                    self._redis_initialized = True
+            return self._redis_available
+        if self.redis is None or time.monotonic() < self._redis_retry_at:
+            return False
+
+        try:
+            self.redis.ping()
+            self._redis_available = True
+            logger.info("[LeadAssigner] Conexión a Redis recuperada")
+        except Exception:
+            self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_INTERVAL
+        return self._redis_available
+
+    def _next_local_index(self, team: str) -> int:
+        """Índice de rotación en memoria (fallback cuando Redis no está disponible)."""
+        with self._local_lock:
+            index = self._local_indices[team]
+            self._local_indices[team] = index + 1
+        return index
 
     def _get_redis_key(self, team: str) -> str:
         """Genera la clave de Redis para un equipo específico."""
-        return f"{self.REDIS_KEY_PREFIX}:index:{team}"
+        key = self._redis_keys.get(team)
+        if key is None:
+            key = f"{self.REDIS_KEY_PREFIX}:index:{team}"
+        return key
 
-    def _get_active_owners(self, team: str) -> List[Dict[str, Any]]:
+    def _get_active_owners(self, team: str) -> Tuple[Dict[str, Any], ...]:
         """
-        Retorna lista de owners activos para un equipo.
+        Retorna los owners activos para un equipo (precalculados en __init__).
 
         Args:
             team: Nombre del equipo
 
         Returns:
-            Lista de owners activos con sus IDs
+            Tupla de owners activos con sus IDs
         """
-        owners = self.OWNERS_CONFIG.get(team, self.OWNERS_CONFIG["default"])
-        return [o for o in owners if o.get("active", True)]
+        return self._active_owners.get(team, self._active_owners["default"])
 
     def get_next_owner(self, channel_origin: str = "whatsapp_directo") -> Optional[str]:
         """
@@ -126,49 +273,57 @@ class LeadAssigner:
         """
         # Determinar equipo basado en canal
         team = self.CHANNEL_TO_TEAM.get(channel_origin, "default")
-        active_owners = self._get_active_owners(team)
 
-        if not active_owners:
-            logger.error(f"[LeadAssigner] No hay owners activos para el equipo '{team}'")
+        # Fast path: equipo con un solo owner (caso más común)
+        owner_id = self._singleton_owner.get(team)
+        if owner_id is not None:
+            logger.debug("[LeadAssigner] Asignando a único owner de '%s' (ID: %s)", team, owner_id)
+            return owner_id
+
+        # Equipos sin configuración usan los owners de "default" (como _get_active_owners)
+        team_key = team if team in self._active_owner_ids else "default"
+        owner_ids = self._active_owner_ids[team_key]
+        owner_count = len(owner_ids)
+
+        if not owner_count:
+            logger.error("[LeadAssigner] No hay owners activos para el equipo '%s'", team)
             return None
 
         # Si solo hay un owner, retornarlo directamente
-        if len(active_owners) == 1:
-            owner_id = active_owners[0]["id"]
-            logger.info(f"[LeadAssigner] Asignando a único owner: {active_owners[0]['name']} (ID: {owner_id})")
+        if owner_count == 1:
+            owner_id = owner_ids[0]
+            logger.info(
+                "[LeadAssigner] Asignando a único owner: %s (ID: %s)",
+                self._active_owner_names[team_key][0], owner_id
+            )
             return owner_id
 
-        # Obtener índice actual de Redis (o inicializar en 0)
-        current_index = 0
+        # Script Lua (INCR + módulo): un solo round-trip y sin carreras entre workers.
+        # La key guarda el índice del PRÓXIMO owner; INCR la crea en 1 si no existe.
+        # Si Redis falla, el contador local toma el relevo para no asignar
+        # todos los leads al primer owner durante la caída.
+        owner_index = None
         redis_key = self._get_redis_key(team)
 
-        if self._redis_available:
+        if self._redis_ready():
             try:
-                stored_index = self.redis.get(redis_key)
-                if stored_index is not None:
-                    current_index = int(stored_index)
+                owner_index = int(self._next_index_script(keys=[redis_key], args=[owner_count]))
             except Exception as e:
-                logger.warning(f"[LeadAssigner] Error leyendo índice de Redis: {e}")
-
-        # Calcular owner actual usando módulo
-        owner_index = current_index % len(active_owners)
-        owner = active_owners[owner_index]
+                logger.warning("[LeadAssigner] Error incrementando índice en Redis: %s. Usando contador local.", e)
+                self._redis_available = False
+                self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_INTERVAL
 
-        # Incrementar índice para la próxima asignación
-        next_index = current_index + 1
+        if owner_index is None:
+            owner_index = self._next_local_index(team) % owner_count
 
-        if self._redis_available:
-            try:
-                self.redis.set(redis_key, next_index)
-            except Exception as e:
-                logger.warning(f"[LeadAssigner] Error guardando índice en Redis: {e}")
+        owner_id = owner_ids[owner_index]
 
         logger.info(
-            f"[LeadAssigner] Asignación Round Robin: {owner['name']} "
-            f"(ID: {owner['id']}, Canal: {channel_origin}, Equipo: {team}, Index: {owner_index})"
+            "[LeadAssigner] Asignación Round Robin: %s (ID: %s, Canal: %s, Equipo: %s, Index: %s)",
+            self._active_owner_names[team_key][owner_index], owner_id, channel_origin, team, owner_index
         )
 
-        return owner["id"]
+        return owner_id
 
     def get_owner_name(self, owner_id: str) -> str:
         """
@@ -180,11 +335,7 @@ class LeadAssigner:
         Returns:
             Nombre del owner o "Desconocido" si no se encuentra
         """
-        for team_owners in self.OWNERS_CONFIG.values():
-            for owner in team_owners:
-                if owner["id"] == owner_id:
-                    return owner["name"]
-        return "Desconocido"
+        return self._owner_names.get(owner_id, "Desconocido")
 
     def detect_channel_origin(self, metadata: Dict[str, Any], session_id: str) -> str:
         """
@@ -193,6 +344,9 @@ class LeadAssigner:
         # 1. Verificar si hay canal explícito en metadata
         explicit_channel = metadata.get("canal_origen") or metadata.get("source") or metadata.get("utm_source")
         if explicit_channel:
+            # Caso común: el canal ya viene canónico → una sola consulta al dict
+            if explicit_channel in self.CHANNEL_TO_TEAM:
+                return explicit_channel
             explicit_channel = explicit_channel.lower().replace(" ", "_")
             if explicit_channel in self.CHANNEL_TO_TEAM:
                 return explicit_channel
@@ -200,16 +354,9 @@ class LeadAssigner:
         # 2. Detectar por patrones en metadata
         referrer = (metadata.get("referrer") or "").lower()
 
-        if "fincaraiz" in referrer or "finca raiz" in referrer:
-            return "finca_raiz"
-        elif "metrocuadrado" in referrer:
-            return "metrocuadrado"
-        elif "facebook" in referrer or "fb.com" in referrer:
-            return "facebook"
-        elif "instagram" in referrer:
-            return "instagram"
-        elif "google" in referrer:
-            return "google_ads"
+        matches = _REFERRER_RE.findall(referrer)
+        if matches:
+            return min(map(_REFERRER_CHANNELS.__getitem__, matches))[1]
 
         # 3. Default: WhatsApp directo
         return "whatsapp_directo"
@@ -218,13 +365,14 @@ class LeadAssigner:
         """
         Reinicia el índice de rotación para un equipo (útil para testing).
         """
-        if not self._redis_available:
+        if not self._redis_ready():
             logger.warning("[LeadAssigner] Redis no disponible para reiniciar índice")
             return False
 
         try:
             redis_key = self._get_redis_key(team)
             self.redis.set(redis_key, 0)
+            self._stats_cache = None
             logger.info(f"[LeadAssigner] Índice reiniciado para equipo '{team}'")
             return True
         except Exception as e:
@@ -238,22 +386,29 @@ class LeadAssigner:
         Returns:
             Diccionario con estadísticas por equipo
         """
+        cached = self._stats_cache
+        if cached is not None and time.monotonic() - cached[0] < self.STATS_CACHE_TTL:
+            return cached[1]
+
+        redis_available = self._redis_ready()
         stats = {
-            "redis_available": self._redis_available,
+            "redis_available": redis_available,
             "teams": {}
         }
 
-        for team in self.OWNERS_CONFIG.keys():
-            active_owners = self._get_active_owners(team)
-            current_index = 0
+        teams = list(self.OWNERS_CONFIG.keys())
+        stored_indices = [None] * len(teams)
 
-            if self._redis_available:
-                try:
-                    stored_index = self.redis.get(self._get_redis_key(team))
-                    if stored_index:
-                        current_index = int(stored_index)
-                except Exception:
-                    pass
+        # Un solo MGET para todos los equipos (1 round-trip en lugar de N)
+        if redis_available:
+            try:
+                stored_indices = self.redis.mget([self._get_redis_key(team) for team in teams])
+            except Exception:
+                pass
+
+        for team, stored_index in zip(teams, stored_indices):
+            active_owners = self._get_active_owners(team)
+            current_index = int(stored_index) if stored_index else 0
 
             stats["teams"][team] = {
                 "active_owners_count": len(active_owners),
@@ -261,6 +416,7 @@ class LeadAssigner:
                 "next_owner": active_owners[current_index % len(active_owners)]["name"] if active_owners else None
             }
 
+        self._stats_cache = (time.monotonic(), stats)
         return stats
 
 
@@ -299,7 +455,7 @@ class OrphanLeadAlert:
             "contact_id": contact_id,
             "phone": phone,
             "reason": reason,
-            "timestamp": datetime.now(timezone.utc).isoformat() + "Z",
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds") + "Z",
             "metadata": metadata or {}
         }
 
@@ -312,10 +468,11 @@ class OrphanLeadAlert:
         # Intentar guardar en Redis si está disponible
         if self._redis_available:
             try:
-                import json
-                self.redis.lpush(self.REDIS_KEY, json.dumps(alert_data))
-                # Mantener solo las últimas 100 alertas
-                self.redis.ltrim(self.REDIS_KEY, 0, 99)
+                # LPUSH + LTRIM en un solo round-trip; se mantienen las últimas 100 alertas
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.lpush(self.REDIS_KEY, orjson.dumps(alert_data))
+                pipe.ltrim(self.REDIS_KEY, 0, 99)
+                pipe.execute()
             except Exception as e:
                 logger.error(f"[OrphanLeadAlert] Error guardando alerta en Redis: {e}")
 
@@ -327,14 +484,23 @@ class OrphanLeadAlert:
             return []
 
         try:
-            import json
             alerts_raw = self.redis.lrange(self.REDIS_KEY, 0, limit - 1)
-            return [json.loads(a) for a in alerts_raw]
+            return [orjson.loads(a) for a in alerts_raw]
         except Exception as e:
             logger.error(f"[OrphanLeadAlert] Error leyendo alertas: {e}")
             return []
 
 
+# Partes fijas del payload del webhook: se comparten entre alertas (solo se serializan)
+_WEBHOOK_DIVIDER_BLOCK = {"type": "divider"}
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Etiqueta legible por canal conocido ("finca_raiz" → "Finca Raiz")
+_CANAL_LABELS = {
+    canal: canal.replace("_", " ").title() for canal in LeadAssigner.CHANNEL_TO_TEAM
+}
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # MONITOR PROACTIVO DE LEADS HUÉRFANOS (BÚSQUEDA EN HUBSPOT)
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -345,15 +511,37 @@ class OrphanLeadMonitor:
     """
 
     REDIS_KEY_ORPHANS = "lead_assigner:orphan_leads_detected"
+    MGET_CHUNK_SIZE = 100
 
-    def __init__(self, hubspot_client, redis_client: Optional[redis.Redis] = None):
+    # Propiedades que se piden a HubSpot para cada lead huérfano: solo las que
+    # usa _format_leads_list (los filtros de búsqueda corren del lado de HubSpot)
+    ORPHAN_PROPERTIES = (
+        "firstname",
+        "lastname",
+        "canal_origen",
+        "chatbot_score",
+        "chatbot_urgency",
+    )
+
+    # Segundos de espera tras contact.creation antes de verificar el owner:
+    # da tiempo a que la asignación normal (ContactManager) termine.
+    NEW_CONTACT_CHECK_DELAY = float(os.getenv("ORPHAN_CHECK_DELAY_SEC", "120"))
+
+    def __init__(self, hubspot_client, redis_client: Optional[aioredis.Redis] = None):
         """
         Inicializa el monitor con cliente HubSpot y Redis.
+
+        Los métodos del monitor son async, así que el cliente Redis es el
+        asíncrono (p. ej. el pool compartido de outbound_panel._get_redis_client).
         """
         self.hubspot = hubspot_client
         self.redis = redis_client
         self._redis_available = redis_client is not None
 
+        # Verificaciones diferidas de contact.creation en curso (ver
+        # schedule_new_contacts_check); se cancelan en el shutdown
+        self._pending_checks: set[asyncio.Task] = set()
+
         # URL del webhook para alertas (Slack, Discord, Teams, etc.)
         self.webhook_url = os.getenv("ORPHAN_LEAD_WEBHOOK_URL")
 
@@ -400,16 +588,7 @@ class OrphanLeadMonitor:
                         ]
                     }
                 ],
-                "properties": [
-                    "firstname",
-                    "lastname",
-                    "phone",
-                    "canal_origen",
-                    "chatbot_score",
-                    "chatbot_location",
-                    "chatbot_urgency",
-                    "chatbot_timestamp"
-                ],
+                "properties": list(self.ORPHAN_PROPERTIES),
                 "limit": 100
             }
 
@@ -431,6 +610,78 @@ class OrphanLeadMonitor:
             logger.error(f"[OrphanLeadMonitor] Error buscando leads huérfanos: {e}", exc_info=True)
             return []
 
+    def schedule_new_contacts_check(self, contact_ids: List[str]) -> None:
+        """
+        Programa check_new_contacts como task rastreada del monitor.
+
+        La espera de NEW_CONTACT_CHECK_DELAY no ocupa un BackgroundTask del
+        request y la task se cancela en cancel_pending_checks() (shutdown).
+        Si el proceso se reinicia antes, el job horario reconcile_orphan_leads
+        (check_orphan_leads) detecta los leads del chatbot que quedaron sin owner.
+        """
+        if not contact_ids:
+            return
+        task = asyncio.create_task(self.check_new_contacts(contact_ids))
+        self._pending_checks.add(task)
+        task.add_done_callback(self._pending_checks.discard)
+
+    async def cancel_pending_checks(self) -> None:
+        """Cancela las verificaciones diferidas pendientes y espera su cierre."""
+        tasks = list(self._pending_checks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if tasks:
+            logger.info(f"[OrphanLeadMonitor] {len(tasks)} verificaciones diferidas canceladas")
+
+    async def check_new_contacts(self, contact_ids: List[str]) -> List[Dict]:
+        """
+        Verifica contactos recién creados (eventos contact.creation de HubSpot).
+
+        Camino push: el webhook de HubSpot dispara esta verificación por lote
+        de contactos nuevos, en lugar de depender del polling periódico de
+        check_orphan_leads, que queda como reconciliación.
+
+        Args:
+            contact_ids: IDs de contactos creados
+
+        Returns:
+            Lista de leads del chatbot que siguen sin owner
+        """
+        if not contact_ids:
+            return []
+
+        await asyncio.sleep(self.NEW_CONTACT_CHECK_DELAY)
+
+        properties = ["hubspot_owner_id", "chatbot_timestamp", *self.ORPHAN_PROPERTIES]
+        orphans = []
+        try:
+            # batch/read: un request por bloque de 100 contactos
+            for i in range(0, len(contact_ids), self.MGET_CHUNK_SIZE):
+                response = await self.hubspot._request(
+                    "POST",
+                    "/crm/v3/objects/contacts/batch/read",
+                    {
+                        "properties": properties,
+                        "inputs": [{"id": cid} for cid in contact_ids[i:i + self.MGET_CHUNK_SIZE]],
+                    },
+                )
+                for contact in response.get("results", []):
+                    props = contact.get("properties") or {}
+                    # Mismo criterio que check_orphan_leads: solo leads del chatbot sin owner
+                    if not props.get("hubspot_owner_id") and props.get("chatbot_timestamp"):
+                        orphans.append(contact)
+
+        except Exception as e:
+            logger.error(f"[OrphanLeadMonitor] Error verificando contactos nuevos: {e}", exc_info=True)
+            return []
+
+        if orphans:
+            logger.warning(f"[OrphanLeadMonitor] ⚠️ {len(orphans)} contactos nuevos sin asignar")
+            await self._send_alert(orphans, hours_window=1)
+
+        return orphans
+
     async def _send_alert(self, orphan_leads: List[Dict], hours_window: int):
         """
         Envía alertas sobre leads huérfanos por múltiples canales.
@@ -462,22 +713,26 @@ class OrphanLeadMonitor:
             orphan_leads: Lista de leads a almacenar
         """
         try:
-            import json
-
-            for lead in orphan_leads:
-                lead_data = {
-                    "contact_id": lead["id"],
-                    "properties": lead.get("properties", {}),
-                    "detected_at": datetime.now(timezone.utc).isoformat() + "Z"
-                }
+            # Un solo timestamp por lote: todos se detectaron en la misma búsqueda
+            detected_at = datetime.now(timezone.utc).isoformat(timespec="seconds") + "Z"
+
+            # Todos los SETEX en un pipeline: un round-trip por lote en lugar de uno por lead
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for lead in orphan_leads:
+                    lead_data = {
+                        "contact_id": lead["id"],
+                        "properties": lead.get("properties", {}),
+                        "detected_at": detected_at
+                    }
 
-                # Guardar con key única por contact_id
-                redis_key = f"{self.REDIS_KEY_ORPHANS}:{lead['id']}"
-                self.redis.setex(
-                    redis_key,
-                    86400,  # TTL 24 horas
-                    json.dumps(lead_data)
-                )
+                    # Guardar con key única por contact_id
+                    redis_key = f"{self.REDIS_KEY_ORPHANS}:{lead['id']}"
+                    pipe.setex(
+                        redis_key,
+                        86400,  # TTL 24 horas
+                        orjson.dumps(lead_data)
+                    )
+                await pipe.execute()
 
             logger.info(f"[OrphanLeadMonitor] {len(orphan_leads)} leads almacenados en Redis")
 
@@ -493,15 +748,19 @@ class OrphanLeadMonitor:
             hours_window: Ventana de tiempo
         """
         try:
-            import httpx
-
             # Construir mensaje
             message = self._format_webhook_message(orphan_leads, hours_window)
 
-            # Reusar singleton si existe, sino crear uno efímero (cold path)
-            if not hasattr(self, '_http_client') or self._http_client is None:
-                self._http_client = httpx.AsyncClient(timeout=10.0)
-            response = await self._http_client.post(self.webhook_url, json=message)
+            # Cliente HTTP global del proceso: conexiones keep-alive reutilizadas
+            # entre alertas y sin crear clientes fuera de los singletons.
+            from middleware.outbound_panel import get_httpx_client
+
+            response = await get_httpx_client().post(
+                self.webhook_url,
+                content=orjson.dumps(message),
+                headers=_JSON_HEADERS,
+                timeout=10.0,
+            )
             response.raise_for_status()
 
             logger.info(f"[OrphanLeadMonitor] ✅ Alerta enviada a webhook ({response.status_code})")
@@ -543,9 +802,7 @@ class OrphanLeadMonitor:
                         )
                     }
                 },
-                {
-                    "type": "divider"
-                },
+                _WEBHOOK_DIVIDER_BLOCK,
                 {
                     "type": "section",
                     "text": {
@@ -572,11 +829,14 @@ class OrphanLeadMonitor:
 
         # Mostrar máximo 10 leads
         for i, lead in enumerate(orphan_leads[:10], 1):
-            props = lead.get("properties", {})
-            name = f"{props.get('firstname', '')} {props.get('lastname', '')}".strip() or "Sin nombre"
-            canal = props.get("canal_origen", "desconocido").replace("_", " ").title()
-            score = props.get("chatbot_score", "N/A")
-            urgency = props.get("chatbot_urgency", "N/A")
+            # batch/read devuelve null en propiedades sin valor: `or` en lugar
+            # del default de .get
+            props = lead.get("properties") or {}
+            name = f"{props.get('firstname') or ''} {props.get('lastname') or ''}".strip() or "Sin nombre"
+            canal = props.get("canal_origen") or "desconocido"
+            canal = _CANAL_LABELS.get(canal) or canal.replace("_", " ").title()
+            score = props.get("chatbot_score") or "N/A"
+            urgency = props.get("chatbot_urgency") or "N/A"
 
             lines.append(
                 f"{i}. *{name}* | Canal: {canal} | Score: {score} | Urgencia: {urgency}"
@@ -588,7 +848,7 @@ class OrphanLeadMonitor:
 
         return "\n".join(lines)
 
-    def get_cached_orphans(self) -> List[Dict]:
+    async def get_cached_orphans(self) -> List[Dict]:
         """
         Obtiene leads huérfanos desde Redis (cache).
 
@@ -599,17 +859,15 @@ class OrphanLeadMonitor:
             return []
 
         try:
-            import json
-
-            # Buscar todas las keys de orphan leads
+            # SCAN incremental (KEYS bloquea Redis sobre todo el keyspace)
             pattern = f"{self.REDIS_KEY_ORPHANS}:*"
-            keys = self.redis.keys(pattern)
+            keys = [key async for key in self.redis.scan_iter(match=pattern, count=500)]
 
+            # Lecturas en bloques con MGET: un round-trip por bloque en lugar de uno por key
             orphans = []
-            for key in keys:
-                data = self.redis.get(key)
-                if data:
-                    orphans.append(json.loads(data))
+            for i in range(0, len(keys), self.MGET_CHUNK_SIZE):
+                values = await self.redis.mget(keys[i:i + self.MGET_CHUNK_SIZE])
+                orphans.extend(orjson.loads(data) for data in values if data)
 
             return orphans
 
@@ -618,6 +876,6 @@ class OrphanLeadMonitor:
             return []
 
 
-# Instancia global (Singleton)
+# Instancia global (Singleton) — no conecta a Redis hasta el primer uso
 lead_assigner = LeadAssigner()
 orphan_alert_system = OrphanLeadAlert()
\ No newline at end of file
@@ -4,9 +4,51 @@ Sistema de conteo de leads pendientes por trabajador.
 Genera notificaciones tipo "Tienes 4 nuevos leads por responder"
 """
 
-from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Any
+import os
+import time
+import asyncio
+from collections import Counter
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
+
+import httpx
+import orjson
+
 from logging_config import logger
+from integrations.hubspot.hubspot_client import BulkheadFullError, CircuitOpenError
+
+
+# Fallas esperables de una búsqueda en HubSpot (red, HTTP tras agotar
+# reintentos, protecciones del cliente, JSON malformado). Cualquier otra
+# excepción es un bug y se propaga.
+_SEARCH_ERRORS = (httpx.HTTPError, CircuitOpenError, BulkheadFullError, orjson.JSONDecodeError)
+
+# Valores de hs_lead_status que sacan a un lead de "pendiente" (ya atendido).
+# El chatbot no asigna hs_lead_status, así que los leads sin valor SÍ cuentan
+# como pendientes: por eso se excluye con NOT_IN y no se filtra con IN.
+# Configurable con LEAD_COUNTER_EXCLUDED_STATUSES (separados por coma; vacío
+# = sin filtro de estado).
+PENDING_EXCLUDED_STATUSES = tuple(
+    status.strip()
+    for status in os.getenv("LEAD_COUNTER_EXCLUDED_STATUSES", "OPEN").split(",")
+    if status.strip()
+)
+
+
+class SearchTruncatedError(Exception):
+    """La búsqueda superó SEARCH_MAX_RESULTS y el resultado quedaría incompleto."""
+
+
+@dataclass(slots=True)
+class Lead:
+    """Lead devuelto en los conteos (para JSON: dataclasses.asdict)."""
+    id: str
+    canal: str = "desconocido"
+    name: str = ""
+    timestamp: str = ""
+    phone: str = ""
+    location: str = ""
+    urgency: str = ""
 
 
 class LeadCounter:
@@ -29,6 +71,30 @@ class LeadCounter:
         "desconocido": "📌"
     }
 
+    # Nombre legible de cada canal conocido ("finca_raiz" → "Finca Raiz")
+    CANAL_DISPLAY = {canal: canal.replace('_', ' ').title() for canal in CANAL_EMOJIS}
+
+    # Límite de HubSpot: máximo 5 filterGroups (OR) por búsqueda
+    MAX_FILTER_GROUPS = 5
+
+    # Tamaño de página de la búsqueda (máximo de HubSpot) y tope de resultados
+    # que la API permite recorrer con el cursor `after`
+    SEARCH_PAGE_SIZE = 200
+    SEARCH_MAX_RESULTS = 10000
+
+    # Propiedades pedidas a HubSpot: detalle completo vs. solo conteo por canal
+    _UNASSIGNED_PROPERTIES = ("firstname", "lastname", "canal_origen", "chatbot_timestamp", "phone")
+    _COUNT_PROPERTIES = ("canal_origen",)
+    _PENDING_PROPERTIES = (
+        "firstname", "lastname", "canal_origen", "chatbot_timestamp",
+        "phone", "chatbot_location", "chatbot_urgency"
+    )
+
+    # Caché de conteos pendientes por (owner_id, hours_window, detailed): absorbe
+    # refrescos repetidos de dashboards/cron sin repetir la búsqueda
+    PENDING_CACHE_TTL = 60
+    PENDING_CACHE_MAXSIZE = 512
+
     def __init__(self, hubspot_client):
         """
         Inicializa el contador con cliente HubSpot.
@@ -37,21 +103,29 @@ class LeadCounter:
             hubspot_client: Instancia de HubSpotClient
         """
         self.hubspot = hubspot_client
+        self._pending_cache: Dict[Tuple[str, int, bool], Tuple[float, Dict[str, Any]]] = {}
         logger.info("[LeadCounter] Inicializado")
 
     async def get_pending_leads_count(
         self,
         owner_id: str,
-        hours_window: int = 24
+        hours_window: int = 24,
+        detailed: bool = True
     ) -> Dict[str, Any]:
         """
         Obtiene conteo de leads pendientes para un trabajador.
+
+        Con detailed=False solo se calculan total y por_canal ("leads" queda
+        vacío): suficiente para notificaciones, sin armar un dict por lead.
+        Los conteos exitosos se cachean PENDING_CACHE_TTL segundos.
         """
+        cached = self._get_cached_count(owner_id, hours_window, detailed)
+        if cached is not None:
+            return cached
+
         try:
             # Calcular timestamp límite (hace X horas)
-            cutoff_timestamp = int(
-                (datetime.now(timezone.utc) - timedelta(hours=hours_window)).timestamp() * 1000
-            )
+            cutoff_timestamp = self._cutoff_ms(hours_window)
 
             # Buscar contactos con las siguientes condiciones:
             # 1. Asignados a este owner
@@ -59,27 +133,19 @@ class LeadCounter:
             # 3. chatbot_timestamp es reciente (últimas X horas)
             # 4. Sin actividad registrada por el trabajador
 
-            leads = await self._search_pending_leads(owner_id, cutoff_timestamp)
-
-            # Agrupar por canal
-            por_canal = {}
-            for lead in leads:
-                canal = lead.get("canal", "desconocido")
-                por_canal[canal] = por_canal.get(canal, 0) + 1
+            contacts = await self._search_pending_leads(owner_id, cutoff_timestamp, detailed=detailed)
+            data = self._summarize_contacts(contacts, detailed)
 
             logger.info(
-                f"[LeadCounter] Owner {owner_id}: {len(leads)} leads pendientes "
-                f"en las últimas {hours_window}h"
+                "[LeadCounter] Owner %s: %d leads pendientes en las últimas %dh",
+                owner_id, data["total"], hours_window
             )
 
-            return {
-                "total": len(leads),
-                "por_canal": por_canal,
-                "leads": leads
-            }
+            return self._cache_count(owner_id, hours_window, detailed, data)
 
-        except Exception as e:
-            logger.error(f"[LeadCounter] Error obteniendo leads pendientes para {owner_id}: {e}")
+        except _SEARCH_ERRORS as e:
+            # Un error no debe confundirse (ni cachearse) como "0 pendientes"
+            logger.error("[LeadCounter] Error obteniendo leads pendientes para %s: %r", owner_id, e)
             return {
                 "total": 0,
                 "por_canal": {},
@@ -87,40 +153,122 @@ class LeadCounter:
                 "error": str(e)
             }
 
+    async def get_pending_leads_counts_bulk(
+        self,
+        owner_ids: List[str],
+        hours_window: int = 24,
+        max_concurrency: int = 4,
+        detailed: bool = True,
+        prefetch: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene el conteo de leads pendientes de varios trabajadores.
+
+        Agrupa hasta MAX_FILTER_GROUPS owners por búsqueda (un filterGroup por
+        owner, combinados con OR) y reparte los resultados localmente, en lugar
+        de una búsqueda por owner.
+
+        Con prefetch=True hace una sola búsqueda de todos los leads recientes
+        con owner y los agrupa en memoria: conviene cuando se consulta a todo
+        el equipo (resumen diario), a cambio de traer también leads de owners
+        no pedidos. Si esa búsqueda supera SEARCH_MAX_RESULTS se descarta y
+        se usa la búsqueda por bloques de owners (no se cachean conteos
+        incompletos).
+
+        Args:
+            owner_ids: Lista de IDs de owners
+            hours_window: Ventana de tiempo en horas
+            max_concurrency: Máximo de búsquedas en vuelo a la vez
+            detailed: False para solo total y por_canal (ver get_pending_leads_count)
+            prefetch: True para una sola búsqueda sin filtrar por owner
+
+        Returns:
+            Diccionario {owner_id: conteo} con la misma forma que get_pending_leads_count
+        """
+        cutoff_timestamp = self._cutoff_ms(hours_window)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        # Solo se buscan los owners sin conteo vigente en caché
+        counts = {}
+        missing = []
+        for owner_id in owner_ids:
+            cached = self._get_cached_count(owner_id, hours_window, detailed)
+            if cached is not None:
+                counts[owner_id] = cached
+            else:
+                missing.append(owner_id)
+
+        async def _count_chunk(chunk: List[str], search) -> Dict[str, Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    contacts_by_owner = await search(chunk, cutoff_timestamp, detailed=detailed)
+                except _SEARCH_ERRORS as e:
+                    logger.error("[LeadCounter] Error obteniendo leads pendientes para %s: %r", chunk, e)
+                    return {
+                        owner_id: {"total": 0, "por_canal": {}, "leads": [], "error": str(e)}
+                        for owner_id in chunk
+                    }
+            return {
+                owner_id: self._cache_count(
+                    owner_id, hours_window, detailed,
+                    self._summarize_contacts(contacts_by_owner.get(owner_id, []), detailed)
+                )
+                for owner_id in chunk
+            }
+
+        searches = 0
+        if prefetch and missing:
+            try:
+                counts.update(await _count_chunk(missing, self._fetch_recent_chatbot_contacts))
+                searches = 1
+                missing = []
+            except SearchTruncatedError as e:
+                logger.warning("[LeadCounter] Prefetch descartado (%s), búsqueda por owners", e)
+
+        chunks = [
+            missing[i:i + self.MAX_FILTER_GROUPS]
+            for i in range(0, len(missing), self.MAX_FILTER_GROUPS)
+        ]
+        gathered = await asyncio.gather(
+            *(_count_chunk(chunk, self._search_pending_leads_bulk) for chunk in chunks)
+        )
+        for chunk_counts in gathered:
+            counts.update(chunk_counts)
+        searches += len(chunks)
+
+        logger.info(
+            "[LeadCounter] %d owners consultados en %d búsquedas (últimas %dh)",
+            len(owner_ids), searches, hours_window
+        )
+        return counts
+
     async def get_unassigned_leads_count(
         self,
-        hours_window: int = 168  # 7 días por defecto
+        hours_window: int = 168,  # 7 días por defecto
+        detailed: bool = True
     ) -> Dict[str, Any]:
         """
         Obtiene conteo de leads huérfanos (sin owner asignado).
+
+        Con detailed=False solo se pide canal_origen a HubSpot: suficiente
+        para total y desglose por canal (alertas), con respuestas más livianas.
         """
         try:
-            cutoff_timestamp = int(
-                (datetime.now(timezone.utc) - timedelta(hours=hours_window)).timestamp() * 1000
-            )
+            cutoff_timestamp = self._cutoff_ms(hours_window)
 
             # Buscar contactos sin owner que tengan chatbot_timestamp
-            leads = await self._search_unassigned_leads(cutoff_timestamp)
-
-            # Agrupar por canal
-            por_canal = {}
-            for lead in leads:
-                canal = lead.get("canal", "desconocido")
-                por_canal[canal] = por_canal.get(canal, 0) + 1
+            leads = await self._search_unassigned_leads(cutoff_timestamp, detailed=detailed)
 
             logger.warning(
-                f"[LeadCounter] ⚠️ {len(leads)} leads sin asignar "
-                f"en las últimas {hours_window}h"
+                "[LeadCounter] ⚠️ %d leads sin asignar en las últimas %dh",
+                len(leads), hours_window
             )
 
-            return {
-                "total": len(leads),
-                "por_canal": por_canal,
-                "leads": leads
-            }
+            return self._summarize_leads(leads)
 
-        except Exception as e:
-            logger.error(f"[LeadCounter] Error obteniendo leads sin asignar: {e}")
+        except _SEARCH_ERRORS as e:
+            # Un error no debe reportarse como "0 leads sin asignar"
+            logger.error("[LeadCounter] Error obteniendo leads sin asignar: %r", e)
             return {
                 "total": 0,
                 "por_canal": {},
@@ -128,6 +276,29 @@ class LeadCounter:
                 "error": str(e)
             }
 
+    async def count_unassigned_leads(self, hours_window: int = 168) -> Optional[int]:
+        """
+        Cuenta leads sin asignar sin descargarlos.
+
+        Pide una sola fila y lee el campo "total" de la búsqueda de HubSpot.
+
+        Returns:
+            Número de leads sin asignar, o None si la búsqueda falló
+        """
+        filters = {
+            "filterGroups": self._unassigned_filter_groups(self._cutoff_ms(hours_window)),
+            "properties": list(self._COUNT_PROPERTIES),
+            "limit": 1
+        }
+        try:
+            response = await self.hubspot._request(
+                "POST", "/crm/v3/objects/contacts/search", filters
+            )
+        except _SEARCH_ERRORS as e:
+            logger.error("[LeadCounter] Error contando leads sin asignar: %r", e)
+            return None
+        return int(response.get("total", 0))
+
     async def generate_notification_message(
         self,
         owner_id: str,
@@ -136,28 +307,33 @@ class LeadCounter:
         """
         Genera mensaje de notificación para el trabajador.
         """
-        data = await self.get_pending_leads_count(owner_id, hours_window)
+        data = await self.get_pending_leads_count(owner_id, hours_window, detailed=False)
+        return self.format_notification_message(data, hours_window)
 
+    def format_notification_message(self, data: Dict[str, Any], hours_window: int = 24) -> str:
+        """
+        Formatea el mensaje de notificación a partir de un conteo ya obtenido.
+        """
         if data["total"] == 0:
             return "✅ No tienes leads pendientes por responder"
 
         # Construir mensaje
         plural_leads = "s" if data["total"] > 1 else ""
-        msg = (
+        parts = [
             f"🔔 **Tienes {data['total']} nuevo{plural_leads} "
             f"lead{plural_leads} por responder**\n\n"
-        )
+        ]
 
         # Agregar desglose por canal
-        for canal, count in sorted(data["por_canal"].items(), key=lambda x: x[1], reverse=True):
+        for canal, count in Counter(data["por_canal"]).most_common():
             emoji = self._get_canal_emoji(canal)
-            canal_name = canal.replace('_', ' ').title()
+            canal_name = self._get_canal_display(canal)
             plural_canal = "s" if count > 1 else ""
-            msg += f"{emoji} {canal_name}: {count} lead{plural_canal}\n"
+            parts.append(f"{emoji} {canal_name}: {count} lead{plural_canal}\n")
 
-        msg += f"\n⏰ Leads recibidos en las últimas {hours_window} horas"
+        parts.append(f"\n⏰ Leads recibidos en las últimas {hours_window} horas")
 
-        return msg
+        return "".join(parts)
 
     async def generate_unassigned_alert(
         self,
@@ -172,30 +348,35 @@ class LeadCounter:
         Returns:
             Mensaje de alerta formateado
         """
-        data = await self.get_unassigned_leads_count(hours_window)
+        data = await self.get_unassigned_leads_count(hours_window, detailed=False)
+        return self.format_unassigned_alert(data, hours_window)
 
+    def format_unassigned_alert(self, data: Dict[str, Any], hours_window: int = 168) -> str:
+        """
+        Formatea la alerta de leads sin asignar a partir de un conteo ya obtenido.
+        """
         if data["total"] == 0:
             return "✅ No hay leads sin asignar"
 
         # Construir mensaje de alerta
         plural = "s" if data["total"] > 1 else ""
-        msg = (
+        parts = [
             f"⚠️ **ALERTA: {data['total']} lead{plural} sin asignar**\n\n"
             f"Estos leads no tienen trabajador asignado:\n\n"
-        )
+        ]
 
         # Desglose por canal
-        for canal, count in sorted(data["por_canal"].items(), key=lambda x: x[1], reverse=True):
+        for canal, count in Counter(data["por_canal"]).most_common():
             emoji = self._get_canal_emoji(canal)
-            canal_name = canal.replace('_', ' ').title()
-            msg += f"{emoji} {canal_name}: {count}\n"
+            canal_name = self._get_canal_display(canal)
+            parts.append(f"{emoji} {canal_name}: {count}\n")
 
-        msg += (
+        parts.append(
             f"\n⏰ Recibidos en los últimos {hours_window // 24} días\n"
             f"🔧 Acción requerida: Asignar manualmente en HubSpot"
         )
 
-        return msg
+        return "".join(parts)
 
     # ═══════════════════════════════════════════════════════════════════════════
     # MÉTODOS PRIVADOS - BÚSQUEDA EN HUBSPOT
@@ -204,127 +385,356 @@ class LeadCounter:
     async def _search_pending_leads(
         self,
         owner_id: str,
-        cutoff_timestamp: int
+        cutoff_timestamp: int,
+        detailed: bool = True
     ) -> List[Dict[str, Any]]:
         """
         Busca leads pendientes de respuesta para un owner específico.
+
+        Retorna los contactos crudos de HubSpot; con detailed=False solo se
+        pide canal_origen.
         """
-        try:
-            # Construir filtros para búsqueda
-            filters = {
-                "filterGroups": [
-                    {
-                        "filters": [
-                            {
-                                "propertyName": "hubspot_owner_id",
-                                "operator": "EQ",
-                                "value": owner_id
-                            },
-                            {
-                                "propertyName": "chatbot_timestamp",
-                                "operator": "GTE",
-                                "value": cutoff_timestamp
-                            },
-                            {
-                                "propertyName": "hs_lead_status",
-                                "operator": "NEQ",
-                                "value": "OPEN"  # Excluir leads ya abiertos
-                            }
-                        ]
-                    }
-                ],
-                "properties": [
-                    "firstname",
-                    "lastname",
-                    "canal_origen",
-                    "chatbot_timestamp",
-                    "phone",
-                    "chatbot_location",
-                    "chatbot_urgency"
-                ],
-                "limit": 100
-            }
+        # Construir filtros para búsqueda
+        filters = {
+            "filterGroups": [
+                {
+                    "filters": [
+                        {
+                            "propertyName": "hubspot_owner_id",
+                            "operator": "EQ",
+                            "value": owner_id
+                        },
+                        {
+                            "propertyName": "chatbot_timestamp",
+                            "operator": "GTE",
+                            "value": cutoff_timestamp
+                        },
+                        *self._pending_status_filters()
+                    ]
+                }
+            ],
+            "properties": list(
+                self._PENDING_PROPERTIES if detailed else self._COUNT_PROPERTIES
+            ),
+            "limit": self.SEARCH_PAGE_SIZE
+        }
+
+        # Ejecutar búsqueda
+        return await self._search_all(filters)
+
+    async def _search_pending_leads_bulk(
+        self,
+        owner_ids: List[str],
+        cutoff_timestamp: int,
+        detailed: bool = True
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Busca leads pendientes de hasta MAX_FILTER_GROUPS owners en una sola búsqueda.
 
-            # Ejecutar búsqueda
-            endpoint = "/crm/v3/objects/contacts/search"
-            response = await self.hubspot._request("POST", endpoint, filters)
-
-            # Procesar resultados
-            leads = []
-            for contact in response.get("results", []):
-                props = contact.get("properties", {})
-                leads.append({
-                    "id": contact["id"],
-                    "name": f"{props.get('firstname', '')} {props.get('lastname', '')}".strip(),
-                    "canal": props.get("canal_origen", "desconocido"),
-                    "timestamp": props.get("chatbot_timestamp", ""),
-                    "phone": props.get("phone", ""),
-                    "location": props.get("chatbot_location", ""),
-                    "urgency": props.get("chatbot_urgency", "")
-                })
-
-            return leads
-
-        except Exception as e:
-            logger.error(f"[LeadCounter] Error en búsqueda de leads pendientes: {e}")
-            return []
+        Cada owner es un filterGroup (HubSpot los combina con OR); los
+        contactos crudos se reparten por hubspot_owner_id. Los errores se
+        propagan para que el llamador los asigne a cada owner del bloque.
+        """
+        filters = {
+            "filterGroups": [
+                {
+                    "filters": [
+                        {"propertyName": "hubspot_owner_id", "operator": "EQ", "value": owner_id},
+                        {"propertyName": "chatbot_timestamp", "operator": "GTE", "value": cutoff_timestamp},
+                        *self._pending_status_filters()
+                    ]
+                }
+                for owner_id in owner_ids
+            ],
+            "properties": [
+                "hubspot_owner_id",
+                *(self._PENDING_PROPERTIES if detailed else self._COUNT_PROPERTIES)
+            ],
+            "limit": self.SEARCH_PAGE_SIZE
+        }
+
+        contacts_by_owner: Dict[str, List[Dict[str, Any]]] = {}
+        for contact in await self._search_all(filters):
+            owner_id = (contact.get("properties") or {}).get("hubspot_owner_id")
+            contacts_by_owner.setdefault(owner_id, []).append(contact)
+
+        return contacts_by_owner
+
+    async def _fetch_recent_chatbot_contacts(
+        self,
+        owner_ids: List[str],
+        cutoff_timestamp: int,
+        detailed: bool = True
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Busca en una sola consulta los leads pendientes recientes de cualquier owner.
 
-    async def _search_unassigned_leads(
+        No filtra por owner (sin límite de filterGroups): los contactos se
+        reparten por hubspot_owner_id y se descartan los de owners no pedidos.
+        Los errores se propagan como en _search_pending_leads_bulk; si la
+        búsqueda supera SEARCH_MAX_RESULTS lanza SearchTruncatedError.
+        """
+        filters = {
+            "filterGroups": [
+                {
+                    "filters": [
+                        {"propertyName": "hubspot_owner_id", "operator": "HAS_PROPERTY"},
+                        {"propertyName": "chatbot_timestamp", "operator": "GTE", "value": cutoff_timestamp},
+                        *self._pending_status_filters()
+                    ]
+                }
+            ],
+            "properties": [
+                "hubspot_owner_id",
+                *(self._PENDING_PROPERTIES if detailed else self._COUNT_PROPERTIES)
+            ],
+            "limit": self.SEARCH_PAGE_SIZE
+        }
+
+        wanted = set(owner_ids)
+        contacts_by_owner: Dict[str, List[Dict[str, Any]]] = {}
+        for contact in await self._search_all(filters, allow_truncated=False):
+            owner_id = (contact.get("properties") or {}).get("hubspot_owner_id")
+            if owner_id in wanted:
+                contacts_by_owner.setdefault(owner_id, []).append(contact)
+
+        return contacts_by_owner
+
+    async def _search_all(
         self,
-        cutoff_timestamp: int
+        filters: Dict[str, Any],
+        allow_truncated: bool = True
     ) -> List[Dict[str, Any]]:
         """
-        Busca leads sin owner asignado (huérfanos).
+        Ejecuta una búsqueda de contactos recorriendo todas las páginas.
+
+        Sigue el cursor paging.next.after hasta agotar resultados o llegar a
+        SEARCH_MAX_RESULTS (HubSpot no pagina más allá de ese tope). Con
+        allow_truncated=False, llegar al tope lanza SearchTruncatedError.
         """
-        try:
-            # Filtros para leads sin owner
-            filters = {
-                "filterGroups": [
+        endpoint = "/crm/v3/objects/contacts/search"
+        payload = dict(filters)
+        results: List[Dict[str, Any]] = []
+
+        while True:
+            response = await self.hubspot._request("POST", endpoint, payload)
+            results.extend(response.get("results", []))
+
+            after = ((response.get("paging") or {}).get("next") or {}).get("after")
+            if not after:
+                return results
+            if len(results) >= self.SEARCH_MAX_RESULTS:
+                if not allow_truncated:
+                    raise SearchTruncatedError(f"más de {len(results)} resultados")
+                logger.warning(
+                    "[LeadCounter] Búsqueda truncada en %d resultados (tope de HubSpot)",
+                    len(results)
+                )
+                return results
+            payload["after"] = after
+
+    @staticmethod
+    def _parse_pending_lead(contact: Dict[str, Any]) -> Lead:
+        """Convierte un contacto de la búsqueda en un Lead pendiente."""
+        # HubSpot siempre incluye "properties" (con null en las propiedades sin
+        # valor: `or` en lugar del default de get); get se enlaza una vez
+        g = contact["properties"].get
+        return Lead(
+            id=contact["id"],
+            name=f"{g('firstname') or ''} {g('lastname') or ''}".strip(),
+            canal=g("canal_origen") or "desconocido",
+            timestamp=g("chatbot_timestamp") or "",
+            phone=g("phone") or "",
+            location=g("chatbot_location") or "",
+            urgency=g("chatbot_urgency") or ""
+        )
+
+    @classmethod
+    def _summarize_contacts(cls, contacts: List[Dict[str, Any]], detailed: bool) -> Dict[str, Any]:
+        """
+        Arma el conteo de leads pendientes desde los contactos crudos.
+
+        Con detailed=False se cuenta por canal directamente, sin armar el
+        Lead de cada contacto.
+        """
+        if detailed:
+            parse = cls._parse_pending_lead
+            return cls._summarize_leads([parse(c) for c in contacts])
+
+        por_canal = Counter(
+            (contact.get("properties") or {}).get("canal_origen") or "desconocido"
+            for contact in contacts
+        )
+        return {
+            "total": len(contacts),
+            "por_canal": por_canal,
+            "leads": []
+        }
+
+    @staticmethod
+    def _summarize_leads(leads: List[Lead]) -> Dict[str, Any]:
+        """Arma el conteo {total, por_canal, leads} de una lista de leads."""
+        por_canal = Counter(lead.canal for lead in leads)
+
+        return {
+            "total": len(leads),
+            "por_canal": por_canal,
+            "leads": leads
+        }
+
+    @staticmethod
+    def _pending_status_filters() -> List[Dict[str, Any]]:
+        """
+        Filtro que excluye los leads ya atendidos (PENDING_EXCLUDED_STATUSES).
+
+        Sin estados configurados no se filtra: HubSpot rechaza NOT_IN vacío.
+        """
+        if not PENDING_EXCLUDED_STATUSES:
+            return []
+        return [{
+            "propertyName": "hs_lead_status",
+            "operator": "NOT_IN",
+            "values": list(PENDING_EXCLUDED_STATUSES)
+        }]
+
+    @staticmethod
+    def _unassigned_filter_groups(cutoff_timestamp: int) -> List[Dict[str, Any]]:
+        """Filtros para leads sin owner con chatbot_timestamp reciente."""
+        return [
+            {
+                "filters": [
                     {
-                        "filters": [
-                            {
-                                "propertyName": "hubspot_owner_id",
-                                "operator": "NOT_HAS_PROPERTY"
-                            },
-                            {
-                                "propertyName": "chatbot_timestamp",
-                                "operator": "GTE",
-                                "value": cutoff_timestamp
-                            }
-                        ]
+                        "propertyName": "hubspot_owner_id",
+                        "operator": "NOT_HAS_PROPERTY"
+                    },
+                    {
+                        "propertyName": "chatbot_timestamp",
+                        "operator": "GTE",
+                        "value": cutoff_timestamp
                     }
-                ],
-                "properties": [
-                    "firstname",
-                    "lastname",
-                    "canal_origen",
-                    "chatbot_timestamp",
-                    "phone"
-                ],
-                "limit": 100
+                ]
             }
+        ]
 
-            # Ejecutar búsqueda
-            endpoint = "/crm/v3/objects/contacts/search"
-            response = await self.hubspot._request("POST", endpoint, filters)
-
-            # Procesar resultados
-            leads = []
-            for contact in response.get("results", []):
-                props = contact.get("properties", {})
-                leads.append({
-                    "id": contact["id"],
-                    "name": f"{props.get('firstname', '')} {props.get('lastname', '')}".strip(),
-                    "canal": props.get("canal_origen", "desconocido"),
-                    "timestamp": props.get("chatbot_timestamp", ""),
-                    "phone": props.get("phone", "")
-                })
-
-            return leads
-
-        except Exception as e:
-            logger.error(f"[LeadCounter] Error en búsqueda de leads sin asignar: {e}")
-            return []
+    async def _search_unassigned_leads(
+        self,
+        cutoff_timestamp: int,
+        detailed: bool = True
+    ) -> List[Lead]:
+        """
+        Busca leads sin owner asignado (huérfanos).
+
+        Con detailed=False cada lead solo trae id y canal.
+        """
+        filters = {
+            "filterGroups": self._unassigned_filter_groups(cutoff_timestamp),
+            "properties": list(
+                self._UNASSIGNED_PROPERTIES if detailed else self._COUNT_PROPERTIES
+            ),
+            "limit": self.SEARCH_PAGE_SIZE
+        }
+
+        # Ejecutar búsqueda
+        results = await self._search_all(filters)
+
+        if not detailed:
+            return [
+                Lead(
+                    id=contact["id"],
+                    canal=(contact.get("properties") or {}).get("canal_origen") or "desconocido"
+                )
+                for contact in results
+            ]
+
+        # Procesar resultados (append y get enlazados fuera de cada lookup)
+        leads = []
+        append = leads.append
+        for contact in results:
+            g = contact["properties"].get
+            append(Lead(
+                id=contact["id"],
+                name=f"{g('firstname') or ''} {g('lastname') or ''}".strip(),
+                canal=g("canal_origen") or "desconocido",
+                timestamp=g("chatbot_timestamp") or "",
+                phone=g("phone") or ""
+            ))
+
+        return leads
+
+    @staticmethod
+    def _cutoff_ms(hours_window: int) -> int:
+        """
+        Timestamp límite (epoch ms) de hace hours_window horas, redondeado al minuto.
+
+        El redondeo hace que todas las búsquedas del mismo minuto compartan
+        el mismo límite, sin construir objetos datetime en cada llamada.
+        """
+        now_minute = int(time.time()) // 60 * 60
+        return (now_minute - hours_window * 3600) * 1000
+
+    def invalidate(self, owner_id: Optional[str] = None) -> None:
+        """
+        Descarta conteos cacheados (p. ej. al recibir un webhook de asignación).
+
+        Args:
+            owner_id: Owner a invalidar; None vacía toda la caché
+        """
+        if owner_id is None:
+            self._pending_cache.clear()
+            return
+        for key in [key for key in self._pending_cache if key[0] == owner_id]:
+            del self._pending_cache[key]
+
+    def _get_cached_count(
+        self,
+        owner_id: str,
+        hours_window: int,
+        detailed: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Retorna una copia del conteo cacheado si sigue vigente.
+
+        Un conteo detallado también sirve para una consulta sin detalle.
+        """
+        keys = [(owner_id, hours_window, True)]
+        if not detailed:
+            keys.insert(0, (owner_id, hours_window, False))
+
+        for key in keys:
+            cached = self._pending_cache.get(key)
+            if cached is None:
+                continue
+            cached_at, data = cached
+            if time.monotonic() - cached_at < self.PENDING_CACHE_TTL:
+                return self._copy_count(data)
+            del self._pending_cache[key]
+        return None
+
+    def _cache_count(
+        self,
+        owner_id: str,
+        hours_window: int,
+        detailed: bool,
+        data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Guarda un conteo exitoso en la caché y retorna una copia."""
+        if len(self._pending_cache) >= self.PENDING_CACHE_MAXSIZE:
+            # Desalojar la entrada más antigua (orden de inserción)
+            self._pending_cache.pop(next(iter(self._pending_cache)))
+        self._pending_cache[(owner_id, hours_window, detailed)] = (time.monotonic(), data)
+        return self._copy_count(data)
+
+    @staticmethod
+    def _copy_count(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Copia de un conteo: el caller puede modificarla sin alterar la caché."""
+        return {**data, "por_canal": Counter(data["por_canal"]), "leads": list(data["leads"])}
+
+    def _get_canal_display(self, canal: str) -> str:
+        """Retorna el nombre legible de un canal (precalculado para los conocidos)."""
+        name = self.CANAL_DISPLAY.get(canal)
+        if name is None:
+            name = canal.replace('_', ' ').title()
+        return name
 
     def _get_canal_emoji(self, canal: str) -> str:
         """
@@ -339,6 +749,20 @@ class LeadCounter:
         return self.CANAL_EMOJIS.get(canal, "📌")
 
 
+# Instancia singleton: la caché de conteos se comparte (y se invalida desde
+# el webhook de HubSpot cuando cambia un owner)
+_lead_counter: Optional[LeadCounter] = None
+
+
+def get_lead_counter() -> LeadCounter:
+    """Obtiene la instancia singleton del LeadCounter."""
+    global _lead_counter
+    if _lead_counter is None:
+        from integrations.hubspot import hubspot_client
+        _lead_counter = LeadCounter(hubspot_client)
+    return _lead_counter
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # FUNCIONES DE UTILIDAD
 # ═══════════════════════════════════════════════════════════════════════════
@@ -350,6 +774,10 @@ async def generate_daily_summary(
     """
     Genera resumen diario de leads pendientes para múltiples trabajadores.
 
+    Los conteos salen de una sola búsqueda de leads recientes agrupada en
+    memoria por owner (ver get_pending_leads_counts_bulk con prefetch=True);
+    el rate limit de búsquedas lo sigue aplicando HubSpotClient.
+
     Args:
         counter: Instancia de LeadCounter
         owner_ids: Lista de IDs de owners
@@ -357,17 +785,89 @@ async def generate_daily_summary(
     Returns:
         Diccionario {owner_id: mensaje_notificacion}
     """
-    summaries = {}
+    # Los mensajes solo usan total y por_canal: no se arma el detalle de cada lead
+    counts = await counter.get_pending_leads_counts_bulk(
+        owner_ids, hours_window=24, detailed=False, prefetch=True
+    )
+
+    return {
+        owner_id: _format_summary(counter, counts[owner_id])
+        for owner_id in owner_ids
+    }
 
-    for owner_id in owner_ids:
-        try:
-            message = await counter.generate_notification_message(owner_id, hours_window=24)
-            summaries[owner_id] = message
-        except Exception as e:
-            logger.error(f"[LeadCounter] Error generando resumen para {owner_id}: {e}")
-            summaries[owner_id] = f"❌ Error generando resumen: {e}"
 
-    return summaries
+async def stream_daily_summaries(
+    counter: LeadCounter,
+    owner_ids: List[str],
+    *,
+    workers: int = 4
+) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Genera el resumen diario por bloques, entregando cada mensaje apenas está listo.
+
+    A diferencia de generate_daily_summary (una sola búsqueda, todo al final),
+    los owners se reparten en bloques de MAX_FILTER_GROUPS que consumen
+    `workers` tareas desde una asyncio.Queue: el llamador puede ir enviando
+    notificaciones mientras siguen las búsquedas de los demás bloques.
+
+    Args:
+        counter: Instancia de LeadCounter
+        owner_ids: Lista de IDs de owners
+        workers: Búsquedas en vuelo a la vez
+
+    Yields:
+        Tuplas (owner_id, mensaje_notificacion)
+    """
+    size = counter.MAX_FILTER_GROUPS
+    chunks: asyncio.Queue = asyncio.Queue()
+    for i in range(0, len(owner_ids), size):
+        chunks.put_nowait(owner_ids[i:i + size])
+
+    done = object()
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def _worker() -> None:
+        try:
+            while not chunks.empty():
+                chunk = chunks.get_nowait()
+                counts = await counter.get_pending_leads_counts_bulk(
+                    chunk, hours_window=24, max_concurrency=1, detailed=False
+                )
+                for owner_id in chunk:
+                    results.put_nowait((owner_id, _format_summary(counter, counts[owner_id])))
+        finally:
+            results.put_nowait(done)
+
+    tasks = [asyncio.create_task(_worker()) for _ in range(max(1, min(workers, chunks.qsize())))]
+    try:
+        pending = len(tasks)
+        while pending:
+            item = await results.get()
+            if item is done:
+                pending -= 1
+                continue
+            yield item
+        # Propaga errores inesperados de los workers (los de HubSpot ya vienen como mensaje)
+        for task in tasks:
+            task.result()
+    finally:
+        # Si el llamador deja de iterar, no quedan búsquedas huérfanas; se
+        # esperan las tareas para recoger sus excepciones (sin warnings de asyncio)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _format_summary(counter: LeadCounter, data: Dict[str, Any]) -> str:
+    """Mensaje del resumen diario de un owner a partir de su conteo."""
+    # Un owner con error no debe tumbar el resumen de los demás
+    if "error" in data:
+        return f"❌ Error generando resumen: {data['error']}"
+    try:
+        return counter.format_notification_message(data, hours_window=24)
+    except Exception as e:
+        logger.error("[LeadCounter] Error formateando resumen: %r", e, exc_info=True)
+        return f"❌ Error generando resumen: {e}"
 
 
 async def check_orphan_leads_threshold(
@@ -377,9 +877,15 @@ async def check_orphan_leads_threshold(
     """
     Verifica si el número de leads huérfanos supera un umbral.
     """
-    data = await counter.get_unassigned_leads_count(hours_window=168)  # 7 días
-
-    if data["total"] >= threshold:
-        return await counter.generate_unassigned_alert(hours_window=168)
-
-    return None
\ No newline at end of file
+    # Primero solo el total (una fila): el caso común, bajo el umbral, no
+    # descarga leads. None = error, ya quedó en el log; no se alerta.
+    total = await counter.count_unassigned_leads(hours_window=168)  # 7 días
+    if total is None or total < threshold:
+        return None
+
+    # Sobre el umbral: búsqueda completa (solo canal_origen) para el desglose
+    data = await counter.get_unassigned_leads_count(hours_window=168, detailed=False)
+    if "error" in data:
+        return None
+
+    return counter.format_unassigned_alert(data, hours_window=168)
\ No newline at end of file
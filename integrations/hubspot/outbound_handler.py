@@ -7,25 +7,32 @@ y los reenvía al cliente por WhatsApp.
 """
 
 import os
-import json
+import asyncio
 import hmac
-import hashlib
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 
 import httpx
-from middleware.conversation_state import get_bogota_now
+import orjson
 
-import redis
-from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
-from twilio.rest import Client as TwilioClient
+import redis.asyncio as aioredis
+from fastapi import APIRouter, Request, Response, HTTPException, BackgroundTasks
 
 from logging_config import logger
 from .contact_finder import get_contact_finder
 from .timeline_logger import get_timeline_logger
 
 
+def _utc_now_iso() -> str:
+    """Hora actual en UTC como ISO con zona (created_at del mapeo de thread)."""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+# Endpoint REST de Twilio para enviar mensajes (Programmable Messaging)
+TWILIO_MESSAGES_URL = "https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
+
+
 @dataclass
 class OutboundMessage:
     """Mensaje saliente desde HubSpot."""
@@ -38,7 +45,7 @@ class OutboundMessage:
 
     def __post_init__(self):
         if self.timestamp is None:
-            self.timestamp = datetime.utcnow()
+            self.timestamp = datetime.now(timezone.utc)
 
 
 class OutboundHandler:
@@ -62,12 +69,16 @@ class OutboundHandler:
     # TTL del mapeo de threads (7 días)
     THREAD_TTL = 7 * 24 * 60 * 60
 
-    def __init__(self, redis_url: Optional[str] = None):
+    # Caché contact_id -> teléfono (evita consultar HubSpot en cada webhook)
+    CONTACT_PHONE_PREFIX = "hubspot:contact_phone:"
+    CONTACT_PHONE_TTL = 60 * 60
+
+    # Propiedades de HubSpot con el teléfono del contacto, en orden de prioridad
+    PHONE_PROPERTIES = ["whatsapp_id", "hs_whatsapp_phone_number", "mobilephone", "phone"]
+
+    def __init__(self):
         """
         Inicializa el handler de mensajes salientes.
-
-        Args:
-            redis_url: URL de conexión a Redis
         """
         # Configuración de Twilio
         self.twilio_account_sid = os.getenv("TWILIO_ACCOUNT_SID")
@@ -79,44 +90,56 @@ class OutboundHandler:
                 "[OutboundHandler] Configuración de Twilio incompleta. "
                 "Los mensajes salientes no funcionarán."
             )
-            self.twilio_client = None
+            self.twilio_messages_url = None
         else:
-            self.twilio_client = TwilioClient(self.twilio_account_sid, self.twilio_auth_token)
+            self.twilio_messages_url = TWILIO_MESSAGES_URL.format(account_sid=self.twilio_account_sid)
 
         # Configuración de HubSpot (para verificación de firma)
         self.hubspot_client_secret = os.getenv("HUBSPOT_CLIENT_SECRET")
+        self._hubspot_key_bytes = (
+            self.hubspot_client_secret.encode() if self.hubspot_client_secret else None
+        )
 
-        # Singleton httpx client para HubSpot API
-        self._http_client: Optional[httpx.AsyncClient] = None
-
-        # Configuración de Redis
-        self.redis_url = redis_url or os.getenv("REDIS_PUBLIC_URL") or os.getenv("REDIS_URL")
-        self._redis_client: Optional[redis.Redis] = None
+        # Redis: cliente compartido del proceso (pool de outbound_panel)
+        self._redis_client: Optional[aioredis.Redis] = None
 
     def _get_http_client(self) -> httpx.AsyncClient:
-        """Singleton httpx.AsyncClient — evita crear pool por request."""
-        if self._http_client is None:
-            self._http_client = httpx.AsyncClient(
-                timeout=10.0,
-                limits=httpx.Limits(
-                    max_keepalive_connections=5,
-                    max_connections=10,
-                    keepalive_expiry=30.0,
-                ),
-            )
-        return self._http_client
+        """Cliente HTTP global del proceso (pool compartido, sin clientes propios)."""
+        from middleware.outbound_panel import get_httpx_client
+
+        return get_httpx_client()
+
+    async def _get_redis(self) -> Optional[aioredis.Redis]:
+        """
+        Obtiene el cliente Redis compartido con lazy initialization.
 
-    def _get_redis(self) -> Optional[redis.Redis]:
-        """Obtiene el cliente Redis con lazy initialization."""
-        if self._redis_client is None and self.redis_url:
+        Usa el pool global del proceso en lugar de abrir conexiones propias.
+        """
+        if self._redis_client is None:
             try:
-                self._redis_client = redis.from_url(self.redis_url)
-                self._redis_client.ping()
+                from middleware.outbound_panel import _get_redis_client
+
+                self._redis_client = await _get_redis_client()
+                await self._redis_client.ping()
             except Exception as e:
                 logger.warning(f"[OutboundHandler] Redis no disponible: {e}")
                 self._redis_client = None
         return self._redis_client
 
+    async def warmup(self) -> None:
+        """
+        Prepara las conexiones antes del primer webhook (llamado en startup).
+
+        Abre el pool Redis con un PING y crea el cliente HTTP global. Un
+        fallo solo queda en el log: el handler sigue con lazy init.
+        """
+        redis_client = await self._get_redis()
+        self._get_http_client()
+        logger.info(
+            f"[OutboundHandler] Warmup listo (redis={'ok' if redis_client else 'no disponible'}, "
+            f"twilio={'ok' if self.twilio_messages_url else 'sin configurar'})"
+        )
+
     def verify_hubspot_signature(self, request_body: bytes, signature: str) -> bool:
         """
         Verifica que el webhook viene de HubSpot.
@@ -128,35 +151,40 @@ class OutboundHandler:
         Returns:
             True si la firma es válida
         """
-        if not self.hubspot_client_secret:
+        if not self._hubspot_key_bytes:
             logger.warning(
                 "[OutboundHandler] HUBSPOT_CLIENT_SECRET no configurado. "
                 "Skipping verificación de firma."
             )
             return True
 
-        expected_signature = hmac.new(
-            self.hubspot_client_secret.encode(),
-            request_body,
-            hashlib.sha256
-        ).hexdigest()
+        try:
+            received = bytes.fromhex(signature)
+        except ValueError:
+            return False
 
-        return hmac.compare_digest(expected_signature, signature)
+        # HMAC one-shot en C (sin objeto hmac intermedio) y comparación en bytes
+        expected = hmac.digest(self._hubspot_key_bytes, request_body, "sha256")
+        return hmac.compare_digest(expected, received)
 
     # =========================================================================
     # Mapeo de Thread ID <-> Número de teléfono
     # =========================================================================
 
-    def save_thread_mapping(
+    async def save_thread_mapping(
         self,
         thread_id: str,
         phone_e164: str,
-        contact_id: str
+        contact_id: str,
+        ts: Optional[str] = None
     ) -> None:
         """
         Guarda el mapeo entre ThreadID de HubSpot y número de teléfono.
+
+        ts: timestamp ISO (UTC) ya calculado por el webhook; si no se pasa,
+        se toma la hora actual.
         """
-        redis_client = self._get_redis()
+        redis_client = await self._get_redis()
         if not redis_client:
             logger.warning("[OutboundHandler] No se puede guardar mapeo sin Redis")
             return
@@ -165,40 +193,15 @@ class OutboundHandler:
         data = {
             "phone": phone_e164,
             "contact_id": contact_id,
-            "created_at": datetime.utcnow().isoformat()
+            "created_at": ts or _utc_now_iso()
         }
 
         try:
-            redis_client.setex(key, self.THREAD_TTL, json.dumps(data))
+            await redis_client.setex(key, self.THREAD_TTL, orjson.dumps(data))
             logger.debug(f"[OutboundHandler] Mapeo guardado: thread={thread_id} -> phone={phone_e164}")
         except Exception as e:
             logger.error(f"[OutboundHandler] Error guardando mapeo: {e}")
 
-    def get_phone_from_thread(self, thread_id: str) -> Optional[Dict[str, str]]:
-        """
-        Obtiene el número de teléfono asociado a un ThreadID.
-
-        Args:
-            thread_id: ID del hilo de conversación
-
-        Returns:
-            Dict con 'phone' y 'contact_id', o None si no existe
-        """
-        redis_client = self._get_redis()
-        if not redis_client:
-            return None
-
-        key = f"{self.THREAD_PREFIX}{thread_id}"
-
-        try:
-            data = redis_client.get(key)
-            if data:
-                return json.loads(data)
-        except Exception as e:
-            logger.error(f"[OutboundHandler] Error obteniendo mapeo: {e}")
-
-        return None
-
     # =========================================================================
     # Envío de mensajes
     # =========================================================================
@@ -218,7 +221,7 @@ class OutboundHandler:
         Returns:
             True si se envió correctamente
         """
-        if not self.twilio_client:
+        if not self.twilio_messages_url:
             logger.error("[OutboundHandler] Cliente Twilio no inicializado")
             return False
 
@@ -227,14 +230,18 @@ class OutboundHandler:
             from_number = f"whatsapp:{self.twilio_number}" if not self.twilio_number.startswith("whatsapp:") else self.twilio_number
             to_number = f"whatsapp:{to_phone}" if not to_phone.startswith("whatsapp:") else to_phone
 
-            message_obj = self.twilio_client.messages.create(
-                from_=from_number,
-                body=message,
-                to=to_number
+            # POST directo a la API REST (async) con el cliente HTTP del
+            # handler: no bloquea el event loop y reutiliza conexiones
+            response = await self._get_http_client().post(
+                self.twilio_messages_url,
+                data={"From": from_number, "To": to_number, "Body": message},
+                auth=(self.twilio_account_sid, self.twilio_auth_token),
+                timeout=10.0
             )
+            response.raise_for_status()
 
             logger.info(
-                f"[OutboundHandler] Mensaje enviado: SID={message_obj.sid}, "
+                f"[OutboundHandler] Mensaje enviado: SID={response.json().get('sid')}, "
                 f"to={to_phone}"
             )
             return True
@@ -247,53 +254,43 @@ class OutboundHandler:
     # Pausa de Sofía
     # =========================================================================
 
-    async def pause_sofia(
+    async def _pause_sofia_redis(
         self,
-        contact_id: str,
         phone_e164: str,
-        reason: str = "Intervención de asesor"
+        reason: str,
+        contact_id: Optional[str] = None
     ) -> bool:
         """
-        Pausa a Sofía para un contacto específico.
+        Marca la conversación como HUMAN_ACTIVE en el estado que lee Sofía.
 
-        Sincroniza el estado en:
-        1. Redis (middleware/conversation_state)
-        2. HubSpot (propiedad sofia_status)
+        Usa ConversationStateManager.activate_human (conv_state:{phone}:{canal},
+        meta e índice del panel), igual que el webhook de sofia_activa. El
+        mensaje del asesor sale por WhatsApp: canal "whatsapp".
         """
-        success = True
+        try:
+            from middleware.outbound_panel import _get_state_manager
+            from middleware.phone_normalizer import PhoneNormalizer
 
-        # 1. Actualizar en Redis (estado de conversación del middleware)
-        redis_client = self._get_redis()
-        if redis_client:
-            try:
-                # Usar la misma estructura que ConversationStateManager
-                from middleware.conversation_state import ConversationStatus
-
-                state_key = f"conv_state:{phone_e164}"
-                state_data = redis_client.get(state_key)
-
-                if state_data:
-                    state = json.loads(state_data)
-                    state["status"] = ConversationStatus.HUMAN_ACTIVE.value
-                    state["handoff_reason"] = reason
-                    state["human_active_since"] = get_bogota_now().isoformat()
-                    redis_client.set(state_key, json.dumps(state))
-                else:
-                    # Crear nuevo estado
-                    new_state = {
-                        "status": ConversationStatus.HUMAN_ACTIVE.value,
-                        "handoff_reason": reason,
-                        "human_active_since": get_bogota_now().isoformat()
-                    }
-                    redis_client.set(state_key, json.dumps(new_state))
-
-                logger.info(f"[OutboundHandler] Sofía pausada en Redis para {phone_e164}")
+            validation = PhoneNormalizer().normalize(phone_e164)
+            if not validation.is_valid:
+                logger.warning(f"[OutboundHandler] Teléfono inválido, no se pausa a Sofía: {phone_e164}")
+                return False
 
-            except Exception as e:
-                logger.error(f"[OutboundHandler] Error pausando en Redis: {e}")
-                success = False
+            paused = await _get_state_manager().activate_human(
+                phone_normalized=validation.normalized,
+                contact_id=contact_id,
+                reason=reason
+            )
+            if paused:
+                logger.info(f"[OutboundHandler] Sofía pausada en Redis para {validation.normalized}")
+            return paused
+
+        except Exception as e:
+            logger.error(f"[OutboundHandler] Error pausando en Redis: {e}")
+            return False
 
-        # 2. Actualizar en HubSpot
+    async def _pause_sofia_hubspot(self, contact_id: str, phone_e164: str) -> bool:
+        """Marca sofia_status=pausada en el contacto de HubSpot."""
         try:
             contact_finder = get_contact_finder()
             await contact_finder.update_sofia_status(
@@ -302,12 +299,11 @@ class OutboundHandler:
                 phone_e164=phone_e164
             )
             logger.info(f"[OutboundHandler] Sofía pausada en HubSpot para contact={contact_id}")
+            return True
 
         except Exception as e:
             logger.error(f"[OutboundHandler] Error pausando en HubSpot: {e}")
-            success = False
-
-        return success
+            return False
 
     # =========================================================================
     # Procesamiento del webhook
@@ -321,7 +317,12 @@ class OutboundHandler:
         """
         Procesa el webhook de salida desde HubSpot.
         """
-        logger.info(f"[OutboundHandler] Webhook recibido: {json.dumps(payload, default=str)[:500]}")
+        logger.info(
+            "[OutboundHandler] Webhook recibido: %s",
+            orjson.dumps(payload, default=str)[:500].decode(errors="ignore")
+        )
+        # Un solo timestamp por webhook para el mapeo del thread
+        ts = _utc_now_iso()
 
         # Extraer datos del payload (ajustar según formato real de HubSpot)
         # El formato depende de cómo configures el webhook en HubSpot
@@ -340,22 +341,27 @@ class OutboundHandler:
         # Opción 1: Desde el payload directo
         phone_e164 = payload.get("recipientPhone") or payload.get("recipient_phone")
 
-        # Opción 2: Desde el mapeo de thread
-        if not phone_e164 and thread_id:
-            mapping = self.get_phone_from_thread(thread_id)
+        if not phone_e164 and (thread_id or contact_id):
+            # Opciones 2 y 3 (caché): mapeo de thread y teléfono del contacto
+            # en un solo MGET, un round-trip a Redis para ambas sondas
+            mapping, cached_phone = await self._probe_phone_caches(thread_id, contact_id)
+
             if mapping:
                 phone_e164 = mapping.get("phone")
                 contact_id = contact_id or mapping.get("contact_id")
 
-        # Opción 3: Buscar por contact_id
-        if not phone_e164 and contact_id:
-            try:
-                contact_finder = get_contact_finder()
-                # Necesitamos obtener el teléfono del contacto
-                # Esto requiere una llamada adicional a HubSpot
-                phone_e164 = await self._get_phone_from_contact(contact_id)
-            except Exception as e:
-                logger.error(f"[OutboundHandler] Error obteniendo teléfono: {e}")
+            if not phone_e164 and cached_phone:
+                phone_e164 = cached_phone
+            elif not phone_e164 and contact_id:
+                # Opción 3: doble miss, se pregunta a HubSpot
+                try:
+                    phone_e164 = await self._fetch_phone_from_hubspot(contact_id)
+                except Exception as e:
+                    logger.error(f"[OutboundHandler] Error obteniendo teléfono: {e}")
+
+            # El siguiente webhook del mismo hilo se resuelve por el mapeo
+            if phone_e164 and thread_id and not mapping:
+                await self.save_thread_mapping(thread_id, phone_e164, contact_id, ts=ts)
 
         if not phone_e164:
             logger.error(
@@ -364,64 +370,133 @@ class OutboundHandler:
             )
             return {"status": "error", "reason": "no_phone"}
 
-        # Pausar a Sofía (el asesor está interviniendo)
+        if not self.twilio_messages_url:
+            logger.error("[OutboundHandler] Cliente Twilio no inicializado")
+            return {"status": "error", "reason": "send_failed"}
+
+        # Pausar a Sofía en Redis antes de responder: es lo que impide que
+        # Sofía conteste si el cliente escribe enseguida.
         if contact_id:
-            await self.pause_sofia(
-                contact_id=contact_id,
-                phone_e164=phone_e164,
-                reason=f"Mensaje de asesor: {sender_email or 'desconocido'}"
+            await self._pause_sofia_redis(
+                phone_e164,
+                reason=f"Mensaje de asesor: {sender_email or 'desconocido'}",
+                contact_id=contact_id
             )
 
-        # Enviar mensaje por WhatsApp
-        sent = await self.send_whatsapp_message(phone_e164, message_text)
+        # HubSpot solo necesita un 2xx rápido: el envío por Twilio, el PATCH
+        # a HubSpot y el Timeline corren después de responder al webhook
+        background_tasks.add_task(self._deliver, phone_e164, message_text, contact_id)
+
+        return {
+            "status": "accepted",
+            "to": phone_e164,
+            "contact_id": contact_id,
+            "sofia_paused": bool(contact_id)
+        }
+
+    async def _deliver(
+        self,
+        phone_e164: str,
+        message_text: str,
+        contact_id: Optional[str]
+    ) -> None:
+        """
+        Entrega en background del mensaje del asesor.
+
+        El PATCH a HubSpot y el envío por Twilio son independientes y corren
+        en paralelo; el Timeline solo se registra si el mensaje salió. Los
+        errores quedan en el log (el webhook ya fue respondido).
+        """
+        if contact_id:
+            _, sent = await asyncio.gather(
+                self._pause_sofia_hubspot(contact_id, phone_e164),
+                self.send_whatsapp_message(phone_e164, message_text)
+            )
+        else:
+            sent = await self.send_whatsapp_message(phone_e164, message_text)
 
         if not sent:
-            return {"status": "error", "reason": "send_failed"}
+            logger.error(f"[OutboundHandler] Mensaje de asesor no enviado a {phone_e164}")
+            return
 
-        # Registrar en Timeline (background)
         if contact_id:
-            timeline_logger = get_timeline_logger()
-            background_tasks.add_task(
-                timeline_logger.log_advisor_message,
+            await get_timeline_logger().log_advisor_message(
                 contact_id=contact_id,
                 content=message_text,
                 session_id=phone_e164
             )
 
-        return {
-            "status": "sent",
-            "to": phone_e164,
-            "contact_id": contact_id,
-            "sofia_paused": True
-        }
-
-    async def _get_phone_from_contact(self, contact_id: str) -> Optional[str]:
+    async def _probe_phone_caches(
+        self,
+        thread_id: Optional[str],
+        contact_id: Optional[str]
+    ) -> tuple[Optional[Dict[str, str]], Optional[str]]:
         """
-        Obtiene el teléfono de un contacto por su ID.
+        Consulta en un solo MGET el mapeo del thread y el teléfono cacheado
+        del contacto.
+
+        Returns:
+            (mapeo del thread o None, teléfono cacheado o None)
         """
-        api_key = os.getenv("HUBSPOT_API_KEY")
-        endpoint = f"https://api.hubapi.com/crm/v3/objects/contacts/{contact_id}"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        params = {
-            "properties": "phone,mobilephone,whatsapp_id,hs_whatsapp_phone_number"
-        }
+        redis_client = await self._get_redis()
+        if not redis_client:
+            return None, None
 
-        client = self._get_http_client()
-        response = await client.get(endpoint, headers=headers, params=params)
+        keys = []
+        if thread_id:
+            keys.append(f"{self.THREAD_PREFIX}{thread_id}")
+        if contact_id:
+            keys.append(f"{self.CONTACT_PHONE_PREFIX}{contact_id}")
 
-        if response.status_code == 200:
-            props = response.json().get("properties", {})
-            return (
-                props.get("whatsapp_id") or
-                props.get("hs_whatsapp_phone_number") or
-                props.get("mobilephone") or
-                props.get("phone")
-            )
+        try:
+            values = iter(await redis_client.mget(*keys))
+        except Exception as e:
+            logger.error(f"[OutboundHandler] Error consultando cachés de teléfono: {e}")
+            return None, None
+
+        raw_mapping = next(values) if thread_id else None
+        cached_phone = next(values) if contact_id else None
+
+        mapping = None
+        if raw_mapping:
+            try:
+                mapping = orjson.loads(raw_mapping)
+            except orjson.JSONDecodeError:
+                logger.warning(f"[OutboundHandler] Mapeo corrupto para thread={thread_id}")
+
+        return mapping, cached_phone or None
+
+    async def _fetch_phone_from_hubspot(self, contact_id: str) -> Optional[str]:
+        """
+        Pide el teléfono del contacto a HubSpot y lo guarda en la caché Redis.
+        """
+        # Cliente HubSpot singleton: pool persistente, auth y reintentos ya resueltos
+        from integrations.hubspot import hubspot_client
+
+        try:
+            contact = await hubspot_client.get_contact(contact_id, properties=self.PHONE_PROPERTIES)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
+
+        props = contact.get("properties", {})
+        phone = (
+            props.get("whatsapp_id") or
+            props.get("hs_whatsapp_phone_number") or
+            props.get("mobilephone") or
+            props.get("phone")
+        )
+
+        redis_client = await self._get_redis()
+        if phone and redis_client:
+            cache_key = f"{self.CONTACT_PHONE_PREFIX}{contact_id}"
+            try:
+                await redis_client.setex(cache_key, self.CONTACT_PHONE_TTL, phone)
+            except Exception as e:
+                logger.warning(f"[OutboundHandler] Error guardando caché de teléfono: {e}")
 
-        return None
+        return phone
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -445,6 +520,7 @@ def get_outbound_handler() -> OutboundHandler:
 @router.post("/outbound")
 async def hubspot_outbound_webhook(
     request: Request,
+    response: Response,
     background_tasks: BackgroundTasks
 ):
     """
@@ -453,7 +529,7 @@ async def hubspot_outbound_webhook(
     Cuando un asesor responde en HubSpot Inbox, este endpoint:
     1. Recibe el mensaje
     2. Pausa a Sofía
-    3. Envía el mensaje por WhatsApp
+    3. Responde 202 y, en background, envía el mensaje por WhatsApp
     4. Registra la actividad
 
     Headers esperados:
@@ -470,11 +546,13 @@ async def hubspot_outbound_webhook(
         raise HTTPException(status_code=401, detail="Invalid signature")
 
     try:
-        payload = await request.json()
-    except Exception:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
     result = await handler.process_outbound_webhook(payload, background_tasks)
+    if result.get("status") == "accepted":
+        response.status_code = 202
 
     return result
 
@@ -491,7 +569,7 @@ async def create_thread_mapping(
     Útil para testing o cuando el mapeo no se crea automáticamente.
     """
     handler = get_outbound_handler()
-    handler.save_thread_mapping(thread_id, phone, contact_id)
+    await handler.save_thread_mapping(thread_id, phone, contact_id)
 
     return {
         "status": "created",
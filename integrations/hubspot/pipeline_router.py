@@ -5,7 +5,9 @@ Determina el pipeline, stage y owner correcto para cada lead según su fuente.
 """
 
 import os
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional
 from logging_config import logger
 
 
@@ -15,8 +17,9 @@ from logging_config import logger
 
 from utils.channels_registry import get_social_media_channels, get_portal_channels
 
-CANALES_REDES_SOCIALES = get_social_media_channels()
-CANALES_PORTALES = get_portal_channels()
+# frozenset: pertenencia O(1) en cada clasificación de lead
+CANALES_REDES_SOCIALES = frozenset(get_social_media_channels())
+CANALES_PORTALES = frozenset(get_portal_channels())
 
 # Mapeo de canal a categoría de HubSpot Analytics
 CANAL_TO_ANALYTICS_SOURCE = {
@@ -39,55 +42,100 @@ CANAL_TO_ANALYTICS_SOURCE = {
     "desconocido": "OTHER_CAMPAIGNS",
 }
 
+# Nombre para mostrar de cada canal
+CANAL_DISPLAY_NAMES = {
+    "instagram": "Instagram",
+    "facebook": "Facebook",
+    "linkedin": "LinkedIn",
+    "youtube": "YouTube",
+    "tiktok": "TikTok",
+    "finca_raiz": "Finca Raíz",
+    "metrocuadrado": "Metrocuadrado",
+    "mercado_libre": "Mercado Libre",
+    "ciencuadras": "Ciencuadras",
+    "pagina_web": "Página Web",
+    "whatsapp_directo": "WhatsApp Directo",
+    "google_ads": "Google Ads",
+    "referido": "Referido",
+    "desconocido": "Desconocido",
+}
+
+
+@lru_cache(maxsize=1)
+def _pipeline_env() -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Configuración de pipelines leída del entorno una sola vez.
+
+    Se lee en el primer routing (no al importar) para respetar load_dotenv();
+    las variables no cambian durante la vida del proceso.
+    """
+    return {
+        "redes": {
+            "pipeline_id": os.getenv("HUBSPOT_PIPELINE_REDES_ID"),
+            "stage_id": os.getenv("HUBSPOT_STAGE_NUEVO_RS"),
+            "owner_id": os.getenv("OWNER_ID_REDES"),
+        },
+        "general": {
+            "pipeline_id": os.getenv("HUBSPOT_PIPELINE_ID"),
+            "stage_id": os.getenv("HUBSPOT_DEAL_STAGE"),
+            "owner_id": os.getenv("HUBSPOT_DEFAULT_OWNER"),
+        },
+    }
+
+
+@lru_cache(maxsize=512)
+def _normalize_channel(channel: Optional[str]) -> str:
+    """Clave canónica de un canal ("Instagram " → "instagram"; vacío → "desconocido")."""
+    return channel.lower().strip() if channel else "desconocido"
+
 
 # ═══════════════════════════════════════════════════════════════════════════
 # FUNCIONES DE ROUTING
 # ═══════════════════════════════════════════════════════════════════════════
 
-def get_target_pipeline(channel: str) -> Dict[str, Any]:
+def get_target_pipeline(channel: str) -> Mapping[str, Any]:
     """
     Determina Pipeline, Stage y Owner basándose en el canal de origen.
-    """
-    channel_clean = channel.lower().strip() if channel else "desconocido"
-
-    # Determinar analytics source
-    analytics_source = CANAL_TO_ANALYTICS_SOURCE.get(channel_clean, "OTHER_CAMPAIGNS")
 
-    if channel_clean in CANALES_REDES_SOCIALES:
-        pipeline_id = os.getenv("HUBSPOT_PIPELINE_REDES_ID")
-        stage_id = os.getenv("HUBSPOT_STAGE_NUEVO_RS")
-        owner_id = os.getenv("OWNER_ID_REDES")
-
-        # Validar que las variables estén configuradas
-        if not pipeline_id:
-            logger.warning("[PipelineRouter] HUBSPOT_PIPELINE_REDES_ID no configurado. Usando pipeline general.")
-            return _get_fallback_pipeline(channel_clean, analytics_source)
+    Retorna la ruta compartida (solo lectura) del canal; quien necesite
+    modificarla debe copiarla con dict(route).
+    """
+    channel_clean = _normalize_channel(channel)
 
-        logger.info(f"[PipelineRouter] Canal '{channel_clean}' → Pipeline Redes Sociales")
-        return {
-            "pipeline_id": pipeline_id,
-            "stage_id": stage_id,
-            "owner_id": owner_id,
-            "analytics_source": analytics_source,
-            "is_social_media": True,
-        }
+    # Una sola búsqueda en la tabla precalculada; canales no registrados
+    # usan la ruta de "desconocido" (pipeline general)
+    routes = _channel_routes()
+    route = routes.get(channel_clean) or routes["desconocido"]
 
-    # Fallback: Pipeline de Ventas General
-    return _get_fallback_pipeline(channel_clean, analytics_source)
+    logger.info(
+        "[PipelineRouter] Canal '%s' → Pipeline %s",
+        channel_clean, "Redes Sociales" if route["is_social_media"] else "General"
+    )
+    return route
 
 
-def _get_fallback_pipeline(channel: str, analytics_source: str) -> Dict[str, Any]:
+@lru_cache(maxsize=1)
+def _channel_routes() -> Dict[str, Mapping[str, Any]]:
     """
-    Retorna configuración del pipeline general (Ventas/Portales).
+    Tabla canal → ruta (pipeline, stage, owner, analytics, red social).
+
+    Se arma una vez con la configuración de _pipeline_env(): cada routing
+    queda en un solo dict.get y sin copias (MappingProxyType inmutable).
     """
-    logger.info(f"[PipelineRouter] Canal '{channel}' → Pipeline General")
-    return {
-        "pipeline_id": os.getenv("HUBSPOT_PIPELINE_ID"),
-        "stage_id": os.getenv("HUBSPOT_DEAL_STAGE"),
-        "owner_id": os.getenv("HUBSPOT_DEFAULT_OWNER"),
-        "analytics_source": analytics_source,
-        "is_social_media": False,
-    }
+    env = _pipeline_env()
+    redes_enabled = bool(env["redes"]["pipeline_id"])
+    if not redes_enabled:
+        logger.warning("[PipelineRouter] HUBSPOT_PIPELINE_REDES_ID no configurado. Usando pipeline general.")
+
+    routes = {}
+    for canal in CANALES_REDES_SOCIALES | CANAL_TO_ANALYTICS_SOURCE.keys():
+        is_social = redes_enabled and canal in CANALES_REDES_SOCIALES
+        routes[canal] = MappingProxyType({
+            **(env["redes"] if is_social else env["general"]),
+            "analytics_source": CANAL_TO_ANALYTICS_SOURCE.get(canal, "OTHER_CAMPAIGNS"),
+            "is_social_media": is_social,
+        })
+    return routes
 
 
 def is_social_media_channel(channel: str) -> bool:
@@ -100,38 +148,18 @@ def is_social_media_channel(channel: str) -> bool:
     Returns:
         True si es red social, False en caso contrario
     """
-    if not channel:
-        return False
-    return channel.lower().strip() in CANALES_REDES_SOCIALES
+    return _normalize_channel(channel) in CANALES_REDES_SOCIALES
 
 
 def get_analytics_source(channel: str) -> str:
     """
     Obtiene el valor de hs_analytics_source para HubSpot.
     """
-    if not channel:
-        return "OTHER_CAMPAIGNS"
-    return CANAL_TO_ANALYTICS_SOURCE.get(channel.lower().strip(), "OTHER_CAMPAIGNS")
+    return CANAL_TO_ANALYTICS_SOURCE.get(_normalize_channel(channel), "OTHER_CAMPAIGNS")
 
 
 def get_display_name(channel: str) -> str:
     """
     Obtiene el nombre para mostrar de un canal.
     """
-    display_names = {
-        "instagram": "Instagram",
-        "facebook": "Facebook",
-        "linkedin": "LinkedIn",
-        "youtube": "YouTube",
-        "tiktok": "TikTok",
-        "finca_raiz": "Finca Raíz",
-        "metrocuadrado": "Metrocuadrado",
-        "mercado_libre": "Mercado Libre",
-        "ciencuadras": "Ciencuadras",
-        "pagina_web": "Página Web",
-        "whatsapp_directo": "WhatsApp Directo",
-        "google_ads": "Google Ads",
-        "referido": "Referido",
-        "desconocido": "Desconocido",
-    }
-    return display_names.get(channel.lower().strip() if channel else "", "Desconocido")
\ No newline at end of file
+    return CANAL_DISPLAY_NAMES.get(_normalize_channel(channel), "Desconocido")
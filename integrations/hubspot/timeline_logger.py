@@ -127,9 +127,8 @@ class TimelineLogger:
         # Rate limiting: semáforo para limitar requests concurrentes
         self._request_semaphore = asyncio.Semaphore(HUBSPOT_MAX_CONCURRENT_REQUESTS)
 
-        # Redis para caché de asociaciones
+        # Redis para caché de asociaciones (cliente compartido del proceso)
         self._redis: Optional[aioredis.Redis] = None
-        self._redis_url = os.getenv("REDIS_PUBLIC_URL", os.getenv("REDIS_URL", "redis://localhost:6379"))
 
         # Singleton httpx client — evita crear/destruir AsyncClient por cada llamada API
         self._http_client: Optional[httpx.AsyncClient] = None
@@ -150,14 +149,11 @@ class TimelineLogger:
         return self._http_client
 
     async def _get_redis(self) -> aioredis.Redis:
-        """Lazy initialization de conexión Redis para caché."""
+        """Lazy initialization: reutiliza el pool Redis global del proceso."""
         if self._redis is None:
-            self._redis = aioredis.from_url(
-                self._redis_url,
-                encoding="utf-8",
-                decode_responses=True,
-                max_connections=5,
-            )
+            from middleware.outbound_panel import _get_redis_client
+
+            self._redis = await _get_redis_client()
         return self._redis
 
     async def _get_cached_associations(self, contact_id: str) -> Optional[List[str]]:
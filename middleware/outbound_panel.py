@@ -183,7 +183,7 @@ def get_httpx_client() -> httpx.AsyncClient:
     Retorna cliente HTTP global con connection pooling.
     
     Reutilizar conexiones TCP reduce latencia y overhead.
-    El cliente se cierra automáticamente al terminar el proceso.
+    El cliente se cierra en el shutdown con close_httpx_client().
     """
     global _httpx_client
     if _httpx_client is None:
@@ -201,6 +201,15 @@ def get_httpx_client() -> httpx.AsyncClient:
         logger.info("[Panel] Cliente HTTP global inicializado con connection pooling")
     return _httpx_client
 
+
+async def close_httpx_client() -> None:
+    """Cierra el cliente HTTP global (shutdown); get_httpx_client() crea uno nuevo si se vuelve a pedir."""
+    global _httpx_client
+    if _httpx_client is not None:
+        await _httpx_client.aclose()
+        _httpx_client = None
+        logger.info("[Panel] Cliente HTTP global cerrado")
+
 # Flag para inicializar templates predefinidos solo una vez por proceso
 _TEMPLATES_INITIALIZED: bool = False
 
@@ -17,7 +17,7 @@ import json
 from typing import Any, Optional
 from datetime import datetime
 
-from fastapi import APIRouter, Form, Request, BackgroundTasks
+from fastapi import APIRouter, Form, Request, BackgroundTasks, HTTPException
 from fastapi.responses import Response
 from twilio.twiml.messaging_response import MessagingResponse
 
@@ -2351,14 +2351,28 @@ async def hubspot_webhook(
 
     Este endpoint permite que HubSpot notifique cuando cambian propiedades
     importantes del contacto, como `sofia_activa`.
+
+    Headers esperados:
+    - X-HubSpot-Signature: Firma de verificación
     """
+    # Verificar firma antes de programar cualquier trabajo
+    from integrations.hubspot import get_outbound_handler
+    signature = request.headers.get("X-HubSpot-Signature", "")
+    body = await request.body()
+
+    if not get_outbound_handler().verify_hubspot_signature(body, signature):
+        logger.warning("[HubSpot Webhook] Firma inválida")
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
     try:
         # Parsear payload (HubSpot envía array de eventos)
-        payload = await request.json()
+        payload = json.loads(body)
         logger.info(f"[HubSpot Webhook] Recibido payload: {payload}")
 
         # HubSpot envía una lista de eventos
         events = payload if isinstance(payload, list) else [payload]
+        created_contact_ids = []
+        owner_changed = False
 
         for event in events:
             property_name = event.get("propertyName", "")
@@ -2366,6 +2380,16 @@ async def hubspot_webhook(
             contact_id = str(event.get("objectId", ""))
             subscription_type = event.get("subscriptionType", "")
 
+            # Contacto nuevo → verificación diferida de lead huérfano (ver abajo)
+            if subscription_type == "contact.creation" and contact_id:
+                created_contact_ids.append(contact_id)
+                continue
+
+            # Cambio de owner → los conteos de leads pendientes cacheados quedan viejos
+            if property_name == "hubspot_owner_id":
+                owner_changed = True
+                continue
+
             # Solo procesar cambios en sofia_activa
             if property_name == "sofia_activa" and contact_id:
                 logger.info(
@@ -2393,6 +2417,16 @@ async def hubspot_webhook(
                         await state_manager.activate_bot(phone)
                         logger.info(f"[HubSpot Webhook] BOT_ACTIVE activado para {phone}")
 
+        if owner_changed:
+            # El evento no trae el owner anterior: se invalidan todos los conteos
+            from integrations.hubspot import get_lead_counter
+            get_lead_counter().invalidate()
+
+        # Una sola tarea por payload: espera y verifica todos los contactos nuevos en batch
+        if created_contact_ids:
+            monitor = await _get_orphan_monitor()
+            monitor.schedule_new_contacts_check(created_contact_ids)
+
         return {"status": "ok", "processed": len(events)}
 
     except (ValueError, KeyError, TypeError) as e:
@@ -2404,6 +2438,36 @@ async def hubspot_webhook(
         return {"status": "error", "message": str(e)}
 
 
+_orphan_monitor = None
+
+
+async def _get_orphan_monitor():
+    """Singleton OrphanLeadMonitor sobre los clientes HubSpot y Redis compartidos."""
+    global _orphan_monitor
+    if _orphan_monitor is None:
+        from .outbound_panel import _get_redis_client
+        from integrations.hubspot.lead_assigner import OrphanLeadMonitor
+        _orphan_monitor = OrphanLeadMonitor(hubspot_client, await _get_redis_client())
+    return _orphan_monitor
+
+
+async def close_orphan_monitor() -> None:
+    """Cancela las verificaciones diferidas del monitor (shutdown)."""
+    if _orphan_monitor is not None:
+        await _orphan_monitor.cancel_pending_checks()
+
+
+async def reconcile_orphan_leads(hours_window: int = 2) -> None:
+    """
+    Job horario (scheduler líder): busca leads del chatbot sin owner.
+
+    Cubre las verificaciones diferidas que se perdieron por un reinicio
+    o deploy; la ventana de 2h solapa ejecuciones consecutivas.
+    """
+    monitor = await _get_orphan_monitor()
+    await monitor.check_orphan_leads(hours_window=hours_window)
+
+
 _hubspot_http_client: Optional["httpx.AsyncClient"] = None
 
 
@@ -0,0 +1,296 @@
+"""
+Tests de validacion para el cliente HubSpot (batching, rate limit, resiliencia).
+No hace llamadas reales: _request se reemplaza por un AsyncMock.
+
+Ejecutar: python -m pytest tests/test_hubspot_client.py -v
+O:       python tests/test_hubspot_client.py
+"""
+import asyncio
+import sys
+import os
+from unittest.mock import AsyncMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("HUBSPOT_API_KEY", "test-dummy-key")
+
+
+def _make_client():
+    from integrations.hubspot.hubspot_client import HubSpotClient
+    return HubSpotClient()
+
+
+# ── Test 1: Busquedas concurrentes por telefono → un solo batch/read ─────
+
+async def test_1_phone_lookups_coalesced():
+    client = _make_client()
+
+    async def fake_request(method, endpoint, json_data=None):
+        return {"results": [
+            {"id": f"c{item['id'][-1]}", "properties": {"whatsapp_id": item["id"]}}
+            for item in json_data["inputs"] if item["id"] != "+573000000003"
+        ]}
+
+    client._request = AsyncMock(side_effect=fake_request)
+
+    results = await asyncio.gather(
+        client.search_contact_by_phone("+573000000001"),
+        client.search_contact_by_phone("+573000000002"),
+        client.search_contact_by_phone("+573000000001"),
+        client.search_contact_by_phone("+573000000003"),
+    )
+
+    assert results == ["c1", "c2", "c1", None], f"Resultados inesperados: {results}"
+    assert client._request.await_count == 1, (
+        f"Se esperaba 1 request batch, hubo {client._request.await_count}"
+    )
+    inputs = client._request.await_args.args[2]["inputs"]
+    assert len(inputs) == 3, f"El batch debe deduplicar telefonos, tiene {len(inputs)} inputs"
+    print("  [PASS] 4 busquedas concurrentes → 1 batch/read con 3 inputs")
+
+
+# ── Test 2: Error del batch → cada caller recibe None ─────────────────────
+
+async def test_2_phone_lookup_batch_error():
+    client = _make_client()
+    client._request = AsyncMock(side_effect=RuntimeError("HubSpot caido"))
+
+    results = await asyncio.gather(
+        client.search_contact_by_phone("+573000000001"),
+        client.search_contact_by_phone("+573000000002"),
+    )
+
+    assert results == [None, None], f"Resultados inesperados: {results}"
+    print("  [PASS] Error en batch/read se propaga como None a cada caller")
+
+
+# ── Test 3: 429 con Retry-After → reintenta y respeta la espera ──────────
+
+async def test_3_request_honors_retry_after():
+    import httpx
+    client = _make_client()
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"id": "42"})
+
+    client._http_client = httpx.AsyncClient(
+        base_url=client.base_url, transport=httpx.MockTransport(handler)
+    )
+
+    response = await client._request("GET", "/crm/v3/objects/contacts/42")
+
+    assert response == {"id": "42"}, f"Respuesta inesperada: {response}"
+    assert len(calls) == 2, f"Se esperaban 2 intentos (429 + 200), hubo {len(calls)}"
+    print("  [PASS] 429 con Retry-After se reintenta y luego responde 200")
+
+
+# ── Test 3b: Busquedas esperando tokens no ocupan el bulkhead ───────────
+
+async def test_3b_search_pacing_outside_bulkhead():
+    import httpx
+    client = _make_client()
+    client._bulkhead = asyncio.Semaphore(1)
+    release_search = asyncio.Event()
+    client._search_bucket.acquire = release_search.wait
+    client._http_client = httpx.AsyncClient(
+        base_url=client.base_url,
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True})),
+    )
+
+    search = asyncio.create_task(client._request("POST", "/crm/v3/objects/contacts/search", {}))
+    await asyncio.sleep(0.01)
+
+    response = await asyncio.wait_for(client._request("GET", "/crm/v3/objects/contacts/42"), 1)
+    assert response == {"ok": True}, "La llamada normal no debe esperar a la busqueda"
+
+    release_search.set()
+    assert await search == {"ok": True}
+    print("  [PASS] Busqueda en pausa por rate limit no bloquea el bulkhead")
+
+
+# ── Test 4: Circuit breaker abre tras fallos y se recupera ───────────────
+
+async def test_4_circuit_breaker_opens_and_recovers():
+    import httpx
+    from integrations.hubspot.hubspot_client import CircuitBreaker, CircuitOpenError
+
+    breaker = CircuitBreaker("/crm/v3/objects/contacts", failure_threshold=2, reset_timeout=0.05)
+    request = httpx.Request("GET", "https://api.hubapi.com/crm/v3/objects/contacts")
+
+    for _ in range(2):
+        try:
+            with breaker.guard():
+                raise httpx.ConnectError("caido", request=request)
+        except httpx.ConnectError:
+            pass
+    assert breaker.state == CircuitBreaker.OPEN, f"Debe estar abierto, esta {breaker.state}"
+
+    try:
+        with breaker.guard():
+            raise AssertionError("No debe ejecutarse con el circuito abierto")
+    except CircuitOpenError:
+        pass
+
+    await asyncio.sleep(0.06)
+    with breaker.guard():
+        pass
+    assert breaker.state == CircuitBreaker.CLOSED, f"Debe cerrarse, esta {breaker.state}"
+    print("  [PASS] Circuito abre tras 2 fallos, rechaza, y cierra tras la prueba")
+
+
+# ── Test 4b: Prueba HALF_OPEN cancelada no traba el circuito ────────────
+
+async def test_4b_cancelled_probe_releases_breaker():
+    import httpx
+    from integrations.hubspot.hubspot_client import CircuitBreaker
+
+    breaker = CircuitBreaker("/crm/v3/objects/contacts", failure_threshold=1, reset_timeout=0.01)
+    request = httpx.Request("GET", "https://api.hubapi.com/crm/v3/objects/contacts")
+    try:
+        with breaker.guard():
+            raise httpx.ConnectError("caido", request=request)
+    except httpx.ConnectError:
+        pass
+    await asyncio.sleep(0.02)
+
+    async def slow_probe():
+        with breaker.guard():
+            await asyncio.sleep(1)
+
+    try:
+        await asyncio.wait_for(slow_probe(), timeout=0.01)
+    except asyncio.TimeoutError:
+        pass
+
+    with breaker.guard():
+        pass
+    assert breaker.state == CircuitBreaker.CLOSED, f"Debe cerrarse, esta {breaker.state}"
+    print("  [PASS] Prueba cancelada libera el circuito; la siguiente llamada lo cierra")
+
+
+# ── Test 5: create_notes_batch parte en bloques de 100 ───────────────────
+
+async def test_5_notes_batch_chunked():
+    client = _make_client()
+
+    async def fake_request(method, endpoint, json_data=None):
+        return {"results": [{"id": str(i)} for i, _ in enumerate(json_data["inputs"])]}
+
+    client._request = AsyncMock(side_effect=fake_request)
+    notes = [{"contact_id": "123", "body": f"nota {i}"} for i in range(150)]
+
+    note_ids = await client.create_notes_batch(notes)
+
+    assert len(note_ids) == 150, f"Se esperaban 150 ids, hay {len(note_ids)}"
+    sizes = [len(call.args[2]["inputs"]) for call in client._request.await_args_list]
+    assert sizes == [100, 50], f"Tamanos de batch inesperados: {sizes}"
+    association = client._request.await_args.args[2]["inputs"][0]["associations"][0]
+    assert association["types"][0]["associationTypeId"] == 202
+    print("  [PASS] 150 notas → 2 requests batch/create (100 + 50)")
+
+
+# ── Test 6: search_contacts_by_email cachea por email normalizado ────────
+
+async def test_6_email_search_cached():
+    client = _make_client()
+    client._request = AsyncMock(return_value={"total": 1, "results": [{"id": "7"}]})
+
+    first = await client.search_contacts_by_email("Ana@Example.com ")
+    second = await client.search_contacts_by_email("ana@example.com")
+
+    assert first == second == {"total": 1, "results": [{"id": "7"}]}
+    assert client._request.await_count == 1, (
+        f"La segunda busqueda debe salir de cache, hubo {client._request.await_count} requests"
+    )
+
+    # Mutar la respuesta devuelta no altera la entrada cacheada
+    second["results"][0]["id"] = "mutado"
+    third = await client.search_contacts_by_email("ana@example.com")
+    assert third == {"total": 1, "results": [{"id": "7"}]}, f"Cache alterado: {third}"
+
+    client.clear_cache()
+    await client.search_contacts_by_email("ana@example.com")
+    assert client._request.await_count == 2, "clear_cache() debe forzar una nueva busqueda"
+
+    # Las busquedas vacias no se cachean: el contacto puede crearse enseguida
+    client._request = AsyncMock(return_value={"total": 0, "results": []})
+    await client.search_contacts_by_email("nuevo@example.com")
+    await client.search_contacts_by_email("nuevo@example.com")
+    assert client._request.await_count == 2, "Una busqueda vacia no debe salir de cache"
+    print("  [PASS] Busquedas con resultados salen de cache como copia; vacias no se cachean")
+
+
+# ── Test 7: Chaos middleware inyecta fallas reproducibles ────────────────
+
+async def test_7_chaos_injection():
+    import httpx
+    from integrations.hubspot.chaos import ChaosMiddleware
+
+    client = _make_client()
+    client._http_client = httpx.AsyncClient(
+        base_url=client.base_url,
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})),
+    )
+    client._chaos = ChaosMiddleware(rate=1.0, faults=[ChaosMiddleware.MALFORMED_JSON], seed=7)
+
+    try:
+        await client._request("GET", "/crm/v3/objects/contacts/1")
+        raise AssertionError("Se esperaba error por JSON malformado")
+    except ValueError:
+        pass
+
+    sequence_a = [ChaosMiddleware(rate=0.5, seed=42)._rng.random() for _ in range(3)]
+    sequence_b = [ChaosMiddleware(rate=0.5, seed=42)._rng.random() for _ in range(3)]
+    assert sequence_a == sequence_b, "Misma semilla debe producir la misma secuencia"
+    assert ChaosMiddleware.from_env() is None, "Chaos debe estar desactivado por defecto"
+    print("  [PASS] Chaos inyecta JSON malformado, es reproducible y esta off por defecto")
+
+
+# ── Runner ─────────────────────────────────────────────────────────────────
+
+async def run_all():
+    tests = [
+        ("Test 1: Busquedas por telefono agrupadas", test_1_phone_lookups_coalesced),
+        ("Test 2: Error de batch → None", test_2_phone_lookup_batch_error),
+        ("Test 3: 429 respeta Retry-After", test_3_request_honors_retry_after),
+        ("Test 3b: Pacing fuera del bulkhead", test_3b_search_pacing_outside_bulkhead),
+        ("Test 4: Circuit breaker", test_4_circuit_breaker_opens_and_recovers),
+        ("Test 4b: Prueba cancelada", test_4b_cancelled_probe_releases_breaker),
+        ("Test 5: Notas en batch", test_5_notes_batch_chunked),
+        ("Test 6: Cache de busqueda por email", test_6_email_search_cached),
+        ("Test 7: Chaos middleware", test_7_chaos_injection),
+    ]
+
+    passed = 0
+    failed = 0
+
+    print("\n" + "=" * 60)
+    print("  Tests — Cliente HubSpot")
+    print("=" * 60 + "\n")
+
+    for name, test_fn in tests:
+        try:
+            print(f"[RUN] {name}")
+            await test_fn()
+            passed += 1
+        except AssertionError as e:
+            print(f"  [FAIL] {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  [ERROR] {type(e).__name__}: {e}")
+            failed += 1
+
+    print(f"\n{'=' * 60}")
+    print(f"  Resultado: {passed} PASS | {failed} FAIL")
+    print(f"{'=' * 60}\n")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = asyncio.run(run_all())
+    sys.exit(0 if success else 1)
@@ -0,0 +1,222 @@
+"""
+Tests de validacion para LeadAssigner (Round Robin y fallback sin Redis).
+No usa Redis real: el cliente se reemplaza por un MagicMock.
+
+Ejecutar: python -m pytest tests/test_lead_assigner.py -v
+O:       python tests/test_lead_assigner.py
+"""
+import sys
+import os
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("HUBSPOT_API_KEY", "test-dummy-key")
+
+
+def _make_assigner(redis_client):
+    from integrations.hubspot.lead_assigner import LeadAssigner
+
+    class TwoOwnerAssigner(LeadAssigner):
+        OWNERS_CONFIG = {
+            "default": [
+                {"name": "A", "id": "1", "active": True},
+                {"name": "B", "id": "2", "active": True},
+            ],
+        }
+
+    return TwoOwnerAssigner(redis_client=redis_client)
+
+
+def _redis_with_script(side_effect):
+    """Mock de Redis cuyo script Lua (INCR + módulo) devuelve side_effect."""
+    mock_redis = MagicMock()
+    script = MagicMock(side_effect=side_effect)
+    mock_redis.register_script = MagicMock(return_value=script)
+    return mock_redis, script
+
+
+# ── Test 1: Round Robin con Redis usa el script Lua ──────────────────────
+
+def test_1_round_robin_with_redis():
+    mock_redis, script = _redis_with_script([0, 1, 0])
+    la = _make_assigner(mock_redis)
+
+    owners = [la.get_next_owner("canal_inexistente") for _ in range(3)]
+
+    assert owners == ["1", "2", "1"], f"Rotacion inesperada: {owners}"
+    assert script.call_count == 3
+    assert script.call_args.kwargs == {"keys": ["lead_assigner:index:default"], "args": [2]}
+    print("  [PASS] Script Lua en Redis rota entre owners")
+
+
+# ── Test 2: Redis caido → contador local mantiene la rotacion ────────────
+
+def test_2_local_fallback_keeps_rotation():
+    mock_redis, script = _redis_with_script(ConnectionError("Redis caido"))
+    mock_redis.ping = MagicMock(side_effect=ConnectionError("Redis caido"))
+    la = _make_assigner(mock_redis)
+
+    owners = [la.get_next_owner("canal_inexistente") for _ in range(4)]
+
+    assert owners == ["1", "2", "1", "2"], f"Rotacion inesperada sin Redis: {owners}"
+    assert script.call_count == 1, (
+        f"Tras el primer fallo no debe reintentar Redis, hubo {script.call_count} llamadas"
+    )
+    print("  [PASS] Sin Redis, el contador local mantiene el Round Robin")
+
+
+# ── Test 3: Redis se recupera tras el intervalo de reintento ─────────────
+
+def test_3_redis_recovers():
+    mock_redis, _ = _redis_with_script([ConnectionError("Redis caido"), 1])
+    la = _make_assigner(mock_redis)
+
+    assert la.get_next_owner("canal_inexistente") == "1"
+    assert la._redis_available is False
+
+    la._redis_retry_at = 0.0
+    assert la.get_next_owner("canal_inexistente") == "2"
+    assert la._redis_available is True, "Tras un PING exitoso Redis debe volver a usarse"
+    print("  [PASS] Redis vuelve a usarse tras reconectar")
+
+
+# ── Test 4: get_assignment_stats reutiliza la lectura dentro del TTL ─────
+
+def test_4_stats_cached():
+    mock_redis = MagicMock()
+    mock_redis.mget = MagicMock(return_value=["3"])
+    la = _make_assigner(mock_redis)
+
+    first = la.get_assignment_stats()
+    second = la.get_assignment_stats()
+
+    assert first is second
+    assert first["teams"]["default"]["next_owner"] == "B"
+    assert mock_redis.mget.call_count == 1, (
+        f"La segunda lectura debe salir de cache, hubo {mock_redis.mget.call_count} MGET"
+    )
+
+    la.reset_index("default")
+    la.get_assignment_stats()
+    assert mock_redis.mget.call_count == 2, "reset_index() debe invalidar la cache"
+    print("  [PASS] Estadisticas cacheadas durante el TTL")
+
+
+# ── Test 5: Sin cliente inyectado, Redis se conecta en el primer uso ────
+
+def test_5_lazy_redis_init():
+    from unittest.mock import patch
+    from integrations.hubspot.lead_assigner import LeadAssigner
+
+    with patch.object(LeadAssigner, "_init_redis") as init_redis:
+        la = LeadAssigner()
+        assert init_redis.call_count == 0, "Crear el asignador no debe conectar a Redis"
+
+        la.get_assignment_stats()
+        la._stats_cache = None
+        la.get_assignment_stats()
+        assert init_redis.call_count == 1, (
+            f"Redis debe inicializarse una sola vez, hubo {init_redis.call_count}"
+        )
+    print("  [PASS] Conexion a Redis diferida al primer uso")
+
+
+# ── Test 6: contact.creation → verificacion batch de leads huerfanos ─────
+
+def test_6_new_contacts_orphan_check():
+    import asyncio
+    from unittest.mock import AsyncMock
+    from integrations.hubspot.lead_assigner import OrphanLeadMonitor
+
+    hubspot = MagicMock()
+    hubspot._request = AsyncMock(return_value={"results": [
+        {"id": "1", "properties": {"hubspot_owner_id": "89096378", "chatbot_timestamp": "1"}},
+        {"id": "2", "properties": {
+            "hubspot_owner_id": None, "chatbot_timestamp": "1",
+            "firstname": None, "lastname": None, "canal_origen": None, "chatbot_score": None,
+        }},
+        {"id": "3", "properties": {"hubspot_owner_id": None, "chatbot_timestamp": None}},
+    ]})
+    monitor = OrphanLeadMonitor(hubspot)
+    monitor.NEW_CONTACT_CHECK_DELAY = 0
+    monitor._send_alert = AsyncMock()
+
+    orphans = asyncio.run(monitor.check_new_contacts(["1", "2", "3"]))
+
+    assert [c["id"] for c in orphans] == ["2"], f"Huerfanos inesperados: {orphans}"
+    assert hubspot._request.await_count == 1, "Debe usar un solo batch/read"
+    monitor._send_alert.assert_awaited_once()
+
+    # Contactos recien creados traen propiedades en null
+    text = monitor._format_leads_list(orphans)
+    assert "*Sin nombre* | Canal: Desconocido | Score: N/A" in text, text
+    print("  [PASS] Contactos nuevos del chatbot sin owner generan alerta")
+
+
+# ── Test 7: Verificacion diferida rastreada y cancelable ────────────────
+
+def test_7_new_contacts_check_cancelled_on_shutdown():
+    import asyncio
+    from unittest.mock import AsyncMock
+    from integrations.hubspot.lead_assigner import OrphanLeadMonitor
+
+    hubspot = MagicMock()
+    hubspot._request = AsyncMock()
+    monitor = OrphanLeadMonitor(hubspot)
+
+    async def scenario():
+        monitor.schedule_new_contacts_check(["1"])
+        assert len(monitor._pending_checks) == 1, "La verificacion debe quedar rastreada"
+        await asyncio.sleep(0)
+        await monitor.cancel_pending_checks()
+
+    asyncio.run(scenario())
+
+    assert not monitor._pending_checks, "Las tasks canceladas se descartan"
+    assert hubspot._request.await_count == 0, "Cancelada durante la espera: sin llamada a HubSpot"
+    print("  [PASS] Verificacion diferida rastreada y cancelada en el shutdown")
+
+
+# ── Runner ────────────────────────────────────────────────────────────────
+
+def run_all():
+    tests = [
+        ("Test 1: Round Robin con Redis", test_1_round_robin_with_redis),
+        ("Test 2: Fallback local sin Redis", test_2_local_fallback_keeps_rotation),
+        ("Test 3: Recuperacion de Redis", test_3_redis_recovers),
+        ("Test 4: Cache de estadisticas", test_4_stats_cached),
+        ("Test 5: Conexion diferida a Redis", test_5_lazy_redis_init),
+        ("Test 6: Verificacion de contactos nuevos", test_6_new_contacts_orphan_check),
+        ("Test 7: Verificacion diferida cancelable", test_7_new_contacts_check_cancelled_on_shutdown),
+    ]
+
+    passed = 0
+    failed = 0
+
+    print("\n" + "=" * 60)
+    print("  Tests — LeadAssigner")
+    print("=" * 60 + "\n")
+
+    for name, test_fn in tests:
+        try:
+            print(f"[RUN] {name}")
+            test_fn()
+            passed += 1
+        except AssertionError as e:
+            print(f"  [FAIL] {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  [ERROR] {type(e).__name__}: {e}")
+            failed += 1
+
+    print(f"\n{'=' * 60}")
+    print(f"  Resultado: {passed} PASS | {failed} FAIL")
+    print(f"{'=' * 60}\n")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all()
+    sys.exit(0 if success else 1)
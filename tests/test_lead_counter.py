@@ -0,0 +1,289 @@
+"""
+Tests de validacion para LeadCounter (conteo de leads pendientes y resumenes).
+No hace llamadas reales: hubspot._request se reemplaza por un AsyncMock.
+
+Ejecutar: python -m pytest tests/test_lead_counter.py -v
+O:       python tests/test_lead_counter.py
+"""
+import asyncio
+import sys
+import os
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("HUBSPOT_API_KEY", "test-dummy-key")
+
+
+def _make_counter(request_side_effect=None, return_value=None):
+    from integrations.hubspot.lead_counter import LeadCounter
+    hubspot = MagicMock()
+    hubspot._request = AsyncMock(side_effect=request_side_effect, return_value=return_value)
+    return LeadCounter(hubspot)
+
+
+# ── Test 1: Conteos de varios owners con busquedas agrupadas ────────────
+
+async def test_1_bulk_counts_grouped_search():
+    owner_ids = [f"o{i}" for i in range(7)]
+
+    async def fake_request(method, endpoint, json_data=None):
+        owners = [g["filters"][0]["value"] for g in json_data["filterGroups"]]
+        if "o6" in owners:
+            raise httpx.ConnectError("HubSpot caido")
+        return {"results": [
+            {"id": "1", "properties": {"hubspot_owner_id": "o0", "canal_origen": "instagram"}},
+            {"id": "2", "properties": {"hubspot_owner_id": "o0", "canal_origen": "instagram"}},
+        ] if "o0" in owners else []}
+
+    counter = _make_counter(request_side_effect=fake_request)
+
+    counts = await counter.get_pending_leads_counts_bulk(owner_ids, detailed=False)
+
+    sizes = [len(c.args[2]["filterGroups"]) for c in counter.hubspot._request.await_args_list]
+    assert sorted(sizes) == [2, 5], f"Se esperaban 2 busquedas (5 + 2 owners), hubo {sizes}"
+    properties = counter.hubspot._request.await_args.args[2]["properties"]
+    assert properties == ["hubspot_owner_id", "canal_origen"], f"Propiedades de mas: {properties}"
+    assert counts["o0"]["total"] == 2 and counts["o1"]["total"] == 0
+    status_filter = counter.hubspot._request.await_args.args[2]["filterGroups"][0]["filters"][-1]
+    assert status_filter["operator"] == "NOT_IN" and status_filter["values"], status_filter
+
+    # Sin estados configurados el filtro se omite (NOT_IN vacio es un 400)
+    from unittest.mock import patch
+    from integrations.hubspot import lead_counter
+    with patch.object(lead_counter, "PENDING_EXCLUDED_STATUSES", ()):
+        counter.invalidate()
+        await counter.get_pending_leads_counts_bulk(["o1"], detailed=False)
+    filters = counter.hubspot._request.await_args.args[2]["filterGroups"][0]["filters"]
+    assert [f["propertyName"] for f in filters] == ["hubspot_owner_id", "chatbot_timestamp"], filters
+    assert "error" in counts["o6"] and "error" not in counts["o0"], "El error debe quedar en su bloque"
+    print("  [PASS] 7 owners → 2 busquedas con filterGroups, errores aislados por bloque")
+
+
+# ── Test 1b: Resumen diario con una sola busqueda agrupada en memoria ───
+
+async def test_1b_daily_summary_prefetch():
+    from integrations.hubspot.lead_counter import generate_daily_summary
+
+    counter = _make_counter(return_value={"results": [
+        {"id": "1", "properties": {"hubspot_owner_id": "o0", "canal_origen": "instagram"}},
+        {"id": "2", "properties": {"hubspot_owner_id": "o0", "canal_origen": "facebook"}},
+        {"id": "3", "properties": {"hubspot_owner_id": "otro", "canal_origen": "instagram"}},
+        {"id": "4", "properties": {"hubspot_owner_id": "o1", "canal_origen": None}},
+    ]})
+
+    summaries = await generate_daily_summary(counter, [f"o{i}" for i in range(7)])
+
+    assert counter.hubspot._request.await_count == 1, (
+        f"Se esperaba 1 busqueda, hubo {counter.hubspot._request.await_count}"
+    )
+    filters = counter.hubspot._request.await_args.args[2]["filterGroups"]
+    assert len(filters) == 1, f"La busqueda no debe filtrar por owner: {filters}"
+    assert "Tienes 2 nuevos leads" in summaries["o0"], summaries["o0"]
+    assert "Desconocido: 1 lead" in summaries["o1"], "canal_origen null → desconocido"
+    assert summaries["o2"].startswith("✅")
+    assert set(summaries) == {f"o{i}" for i in range(7)}, "Owners no pedidos se descartan"
+    print("  [PASS] 7 owners → 1 busqueda agrupada por owner en memoria")
+
+
+# ── Test 1c: Prefetch truncado → busqueda por bloques de owners ─────────
+
+async def test_1c_truncated_prefetch_falls_back():
+    owner_ids = [f"o{i}" for i in range(7)]
+
+    async def fake_request(method, endpoint, json_data=None):
+        if len(json_data["filterGroups"]) == 1 and json_data["filterGroups"][0]["filters"][0][
+                "operator"] == "HAS_PROPERTY":
+            # Prefetch: siempre hay otra pagina (supera el tope)
+            return {"results": [{"id": "x", "properties": {"hubspot_owner_id": "o0"}}],
+                    "paging": {"next": {"after": "1"}}}
+        return {"results": []}
+
+    counter = _make_counter(request_side_effect=fake_request)
+    counter.SEARCH_MAX_RESULTS = 2
+
+    counts = await counter.get_pending_leads_counts_bulk(owner_ids, detailed=False, prefetch=True)
+
+    group_sizes = [len(c.args[2]["filterGroups"]) for c in counter.hubspot._request.await_args_list[2:]]
+    assert sorted(group_sizes) == [2, 5], f"Se esperaba la busqueda por bloques, hubo {group_sizes}"
+    assert all(counts[o]["total"] == 0 for o in owner_ids), "No se usan conteos truncados"
+    print("  [PASS] Prefetch sobre el tope se descarta y se busca por bloques de owners")
+
+
+# ── Test 2: Busqueda pagina con el cursor after ──────────────────────────
+
+async def test_2_search_follows_cursor():
+    pages = [
+        {"results": [{"id": "1", "properties": {}}], "paging": {"next": {"after": "200"}}},
+        {"results": [{"id": "2", "properties": {}}]},
+    ]
+    seen_after = []
+
+    async def fake_request(method, endpoint, json_data=None):
+        seen_after.append(json_data.get("after"))
+        return pages[len(seen_after) - 1]
+
+    counter = _make_counter(request_side_effect=fake_request)
+
+    data = await counter.get_unassigned_leads_count()
+
+    assert data["total"] == 2, f"Se esperaban 2 leads en 2 paginas, hay {data['total']}"
+    assert seen_after == [None, "200"], f"Cursores inesperados: {seen_after}"
+    print("  [PASS] Busqueda recorre todas las paginas con paging.next.after")
+
+
+# ── Test 3: Conteos pendientes cacheados por owner y ventana ─────────────
+
+async def test_3_pending_count_cached():
+    counter = _make_counter(return_value={"results": [
+        {"id": "1", "properties": {"hubspot_owner_id": "o1", "canal_origen": "facebook"}},
+    ]})
+
+    first = await counter.get_pending_leads_count("o1")
+    second = await counter.get_pending_leads_count("o1")
+    bulk = await counter.get_pending_leads_counts_bulk(["o1"])
+
+    assert first == second == bulk["o1"]
+    first["leads"].clear()
+    first["por_canal"]["facebook"] += 5
+    again = await counter.get_pending_leads_count("o1")
+    assert again["total"] == 1 and again["por_canal"]["facebook"] == 1 and len(again["leads"]) == 1, (
+        "Modificar el resultado no debe alterar la caché"
+    )
+    assert counter.hubspot._request.await_count == 1, (
+        f"Las lecturas repetidas deben salir de cache, hubo {counter.hubspot._request.await_count}"
+    )
+
+    counter.invalidate("o1")
+    await counter.get_pending_leads_count("o1")
+    assert counter.hubspot._request.await_count == 2, "invalidate() debe forzar una nueva busqueda"
+
+    counter.hubspot._request.side_effect = httpx.ConnectError("HubSpot caido")
+    counter.invalidate()
+    failed = await counter.get_pending_leads_count("o1")
+    assert "error" in failed and not counter._pending_cache, "Los errores no se cachean"
+    print("  [PASS] Conteos cacheados (copias), invalidables y sin cachear errores")
+
+
+# ── Test 4: Falla de busqueda sin asignar → error, no "0 leads" ─────────
+
+async def test_4_unassigned_search_error_surfaces():
+    from integrations.hubspot.hubspot_client import HubSpotRateLimitError
+    from integrations.hubspot.lead_counter import check_orphan_leads_threshold
+
+    request = httpx.Request("POST", "https://api.hubapi.com/crm/v3/objects/contacts/search")
+    counter = _make_counter(request_side_effect=HubSpotRateLimitError("429 agotado", request=request))
+
+    data = await counter.get_unassigned_leads_count()
+    assert data.get("error") == "429 agotado", f"Se esperaba el error propagado: {data}"
+    assert await check_orphan_leads_threshold(counter, threshold=0) is None
+
+    # Un bug (no una falla de HubSpot) no se disfraza de conteo con error
+    counter.hubspot._request.side_effect = KeyError("results")
+    try:
+        await counter.get_unassigned_leads_count()
+        raise AssertionError("Se esperaba que el KeyError se propagara")
+    except KeyError:
+        pass
+    print("  [PASS] Falla de HubSpot se reporta como error; bugs se propagan")
+
+
+# ── Test 5: Umbral de huerfanos consulta solo el total primero ──────────
+
+async def test_5_orphan_threshold_counts_first():
+    from integrations.hubspot.lead_counter import check_orphan_leads_threshold
+
+    counter = _make_counter(return_value={"total": 3, "results": [
+        {"id": "1", "properties": {"canal_origen": "instagram"}},
+    ]})
+
+    assert await check_orphan_leads_threshold(counter, threshold=5) is None
+    assert counter.hubspot._request.await_count == 1, "Bajo el umbral basta una consulta"
+    assert counter.hubspot._request.await_args.args[2]["limit"] == 1
+
+    counter.hubspot._request.return_value = {"total": 6, "results": [
+        {"id": str(i), "properties": {"canal_origen": "instagram"}} for i in range(6)
+    ]}
+    alert = await check_orphan_leads_threshold(counter, threshold=5)
+    assert alert and "6 leads sin asignar" in alert, alert
+    assert counter.hubspot._request.await_count == 3, "Sobre el umbral: total + busqueda completa"
+    print("  [PASS] Bajo el umbral solo se pide el total; sobre el umbral se arma la alerta")
+
+
+# ── Test 6: Resumen en streaming entrega cada owner una sola vez ────────
+
+async def test_6_stream_daily_summaries():
+    from integrations.hubspot.lead_counter import stream_daily_summaries
+
+    owner_ids = [f"o{i}" for i in range(12)]
+    counter = _make_counter(return_value={"results": [
+        {"id": "1", "properties": {"hubspot_owner_id": "o7", "canal_origen": "instagram"}},
+    ]})
+
+    received = [item async for item in stream_daily_summaries(counter, owner_ids, workers=2)]
+
+    assert sorted(owner for owner, _ in received) == sorted(owner_ids), received
+    assert counter.hubspot._request.await_count == 3, "12 owners → 3 bloques de busqueda"
+    assert "Tienes 1 nuevo lead" in dict(received)["o7"]
+    assert [item async for item in stream_daily_summaries(counter, [])] == []
+
+    # El llamador corta a mitad: los workers quedan cancelados y esperados
+    async def slow_search(method, endpoint, json_data=None):
+        owners = [g["filters"][0]["value"] for g in json_data["filterGroups"]]
+        if "o0" not in owners:
+            await asyncio.sleep(0.05)  # el primer bloque responde, el resto sigue en vuelo
+        return {"results": []}
+
+    counter = _make_counter(request_side_effect=slow_search)
+    stream = stream_daily_summaries(counter, owner_ids, workers=2)
+    await stream.__anext__()
+    await stream.aclose()
+    assert asyncio.all_tasks() == {asyncio.current_task()}, "No deben quedar workers vivos"
+    print("  [PASS] 12 owners → 3 bloques, cada resumen entregado una vez")
+
+
+# ── Runner ─────────────────────────────────────────────────────────────────
+
+async def run_all():
+    tests = [
+        ("Test 1: Conteos con busqueda agrupada", test_1_bulk_counts_grouped_search),
+        ("Test 1b: Resumen diario con prefetch", test_1b_daily_summary_prefetch),
+        ("Test 1c: Prefetch truncado", test_1c_truncated_prefetch_falls_back),
+        ("Test 2: Paginacion con cursor", test_2_search_follows_cursor),
+        ("Test 3: Cache de conteos pendientes", test_3_pending_count_cached),
+        ("Test 4: Error en busqueda sin asignar", test_4_unassigned_search_error_surfaces),
+        ("Test 5: Umbral de huerfanos", test_5_orphan_threshold_counts_first),
+        ("Test 6: Resumen diario en streaming", test_6_stream_daily_summaries),
+    ]
+
+    passed = 0
+    failed = 0
+
+    print("\n" + "=" * 60)
+    print("  Tests — LeadCounter")
+    print("=" * 60 + "\n")
+
+    for name, test_fn in tests:
+        try:
+            print(f"[RUN] {name}")
+            await test_fn()
+            passed += 1
+        except AssertionError as e:
+            print(f"  [FAIL] {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  [ERROR] {type(e).__name__}: {e}")
+            failed += 1
+
+    print(f"\n{'=' * 60}")
+    print(f"  Resultado: {passed} PASS | {failed} FAIL")
+    print(f"{'=' * 60}\n")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = asyncio.run(run_all())
+    sys.exit(0 if success else 1)
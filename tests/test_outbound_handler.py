@@ -0,0 +1,269 @@
+"""
+Tests de validacion para OutboundHandler (webhook HubSpot -> WhatsApp).
+No hace llamadas reales: Redis, Twilio y HubSpot se reemplazan por mocks.
+
+Ejecutar: python -m pytest tests/test_outbound_handler.py -v
+O:       python tests/test_outbound_handler.py
+"""
+import asyncio
+import sys
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("HUBSPOT_API_KEY", "test-dummy-key")
+
+
+def _make_handler():
+    from integrations.hubspot.outbound_handler import OutboundHandler
+    handler = OutboundHandler()
+    handler._redis_client = AsyncMock()
+    handler._pause_sofia_redis = AsyncMock(return_value=True)
+    handler.twilio_messages_url = "https://api.twilio.com/2010-04-01/Accounts/AC1/Messages.json"
+    handler.twilio_number = "+10000000000"
+    http_client = MagicMock()
+    http_client.post = AsyncMock(return_value=httpx.Response(
+        201, json={"sid": "SM1"}, request=httpx.Request("POST", handler.twilio_messages_url)
+    ))
+    handler._get_http_client = MagicMock(return_value=http_client)
+    return handler
+
+
+def _patched_services():
+    from integrations.hubspot import outbound_handler
+    finder = MagicMock()
+    finder.update_sofia_status = AsyncMock()
+    timeline = MagicMock()
+    timeline.log_advisor_message = AsyncMock()
+    return (
+        finder,
+        timeline,
+        patch.object(outbound_handler, "get_contact_finder", return_value=finder),
+        patch.object(outbound_handler, "get_timeline_logger", return_value=timeline),
+    )
+
+
+# ── Test 1: Webhook responde 202 y entrega en background ─────────────────
+
+async def test_1_webhook_acks_then_delivers():
+    from fastapi import BackgroundTasks
+
+    handler = _make_handler()
+    finder, timeline, patch_finder, patch_timeline = _patched_services()
+    background_tasks = BackgroundTasks()
+
+    with patch_finder, patch_timeline:
+        result = await handler.process_outbound_webhook(
+            {"body": "hola", "contactId": "1", "recipientPhone": "+573000000001"},
+            background_tasks
+        )
+
+        assert result["status"] == "accepted", f"Respuesta inesperada: {result}"
+        assert handler._pause_sofia_redis.await_count == 1, "La pausa en Redis va antes de responder"
+        assert handler._get_http_client().post.await_count == 0, "Twilio no va en el request"
+
+        await background_tasks()
+
+    assert handler._get_http_client().post.await_count == 1
+    assert handler._get_http_client().post.await_args.kwargs["data"]["To"] == "whatsapp:+573000000001"
+    assert finder.update_sofia_status.await_count == 1
+    assert timeline.log_advisor_message.await_count == 1
+    print("  [PASS] Pausa en Redis inline; Twilio, HubSpot y Timeline en background")
+
+
+# ── Test 2: Envio fallido no registra en Timeline ────────────────────────
+
+async def test_2_failed_send_skips_timeline():
+    handler = _make_handler()
+    handler._get_http_client().post.side_effect = httpx.ConnectError("Twilio caido")
+    finder, timeline, patch_finder, patch_timeline = _patched_services()
+
+    with patch_finder, patch_timeline:
+        await handler._deliver("+573000000001", "hola", "1")
+
+    assert finder.update_sofia_status.await_count == 1, "La pausa en HubSpot no depende del envio"
+    assert timeline.log_advisor_message.await_count == 0, "Sin envio no hay registro en Timeline"
+    print("  [PASS] Error de Twilio queda en el log y no registra Timeline")
+
+
+# ── Test 3: Telefono del contacto via HubSpot singleton + cache Redis ───
+
+async def test_3_phone_from_hubspot_cached():
+    from integrations.hubspot import hubspot_client
+
+    handler = _make_handler()
+    contact = {"properties": {"mobilephone": "+573000000002", "phone": "+573000000003"}}
+
+    with patch.object(hubspot_client, "get_contact", AsyncMock(return_value=contact)) as get_contact:
+        phone = await handler._fetch_phone_from_hubspot("42")
+
+    assert phone == "+573000000002", f"Telefono inesperado: {phone}"
+    assert get_contact.await_args.args[0] == "42"
+    handler._redis_client.setex.assert_awaited_once_with(
+        "hubspot:contact_phone:42", handler.CONTACT_PHONE_TTL, "+573000000002"
+    )
+    print("  [PASS] Telefono resuelto en HubSpot y guardado en cache Redis")
+
+
+# ── Test 4: Firma HMAC de HubSpot ────────────────────────────────────────
+
+async def test_4_signature_verification():
+    import hashlib
+    import hmac
+
+    handler = _make_handler()
+    handler._hubspot_key_bytes = b"secreto"
+    body = b'{"body": "hola"}'
+    signature = hmac.new(b"secreto", body, hashlib.sha256).hexdigest()
+
+    assert handler.verify_hubspot_signature(body, signature)
+    assert handler.verify_hubspot_signature(body, signature.upper()), "Hex en mayusculas es valido"
+    assert not handler.verify_hubspot_signature(body + b" ", signature)
+    assert not handler.verify_hubspot_signature(body, "no-es-hex")
+    print("  [PASS] Firma valida aceptada; alterada o malformada rechazada")
+
+
+# ── Test 5: Mapeo de thread y caché de contacto en un solo MGET ───────
+
+async def test_5_phone_caches_single_mget():
+    from fastapi import BackgroundTasks
+    from integrations.hubspot import hubspot_client
+
+    handler = _make_handler()
+    _, _, patch_finder, patch_timeline = _patched_services()
+    payload = {"body": "hola", "threadId": "t1", "contactId": "42"}
+
+    with patch_finder, patch_timeline, \
+            patch.object(hubspot_client, "get_contact", AsyncMock()) as get_contact:
+        handler._redis_client.mget.return_value = [None, "+573000000002"]
+        result = await handler.process_outbound_webhook(payload, BackgroundTasks())
+
+        assert result["to"] == "+573000000002", f"Respuesta inesperada: {result}"
+        handler._redis_client.mget.assert_awaited_once_with(
+            "hubspot:thread:t1", "hubspot:contact_phone:42"
+        )
+        assert handler._redis_client.get.await_count == 0, "Sin GETs sueltos: solo el MGET"
+        assert get_contact.await_count == 0, "Con caché no se llama a HubSpot"
+
+        # Doble miss: HubSpot una vez y se guarda el mapeo del thread
+        handler._redis_client.setex.reset_mock()
+        handler._redis_client.mget.return_value = [None, None]
+        get_contact.return_value = {"properties": {"phone": "+573000000003"}}
+        result = await handler.process_outbound_webhook(payload, BackgroundTasks())
+
+        assert result["to"] == "+573000000003"
+        assert get_contact.await_count == 1
+        assert handler._redis_client.get.await_count == 0, "El doble miss no repite el GET"
+        saved_keys = [c.args[0] for c in handler._redis_client.setex.await_args_list]
+        assert saved_keys == ["hubspot:contact_phone:42", "hubspot:thread:t1"], saved_keys
+
+        # El mapeo guarda el timestamp UTC (con zona) del webhook
+        import orjson
+        created_at = orjson.loads(handler._redis_client.setex.await_args.args[2])["created_at"]
+        assert created_at.endswith("+00:00"), created_at
+    print("  [PASS] Mapeo y caché en 1 MGET; HubSpot solo en doble miss")
+
+
+# ── Test 6: La pausa escribe el estado que lee la conversacion ─────────
+
+async def test_6_pause_uses_conversation_state():
+    from integrations.hubspot.outbound_handler import OutboundHandler
+
+    handler = OutboundHandler()
+    state_manager = MagicMock()
+    state_manager.activate_human = AsyncMock(return_value=True)
+
+    # outbound_panel se sustituye en sys.modules: importarlo exige credenciales de OpenAI
+    panel = MagicMock(_get_state_manager=MagicMock(return_value=state_manager))
+
+    with patch.dict(sys.modules, {"middleware.outbound_panel": panel}):
+        assert await handler._pause_sofia_redis("whatsapp:+573001234567", "asesor", contact_id="42")
+        assert not await handler._pause_sofia_redis("no-es-telefono", "asesor")
+
+    state_manager.activate_human.assert_awaited_once_with(
+        phone_normalized="+573001234567", contact_id="42", reason="asesor"
+    )
+    print("  [PASS] Pausa via activate_human con el telefono normalizado (conv_state:{phone}:{canal})")
+
+
+# ── Test 7: /hubspot/webhook verifica la firma antes de programar trabajo ──
+
+async def test_7_hubspot_webhook_requires_signature():
+    import hashlib
+    import hmac
+    from fastapi import FastAPI
+
+    os.environ.setdefault("OPENAI_API_KEY", "test-dummy-key")
+    from middleware import webhook_handler
+    from integrations.hubspot import outbound_handler
+
+    app = FastAPI()
+    app.include_router(webhook_handler.router)
+    handler = _make_handler()
+    handler._hubspot_key_bytes = b"secreto"
+    monitor = MagicMock()
+    body = b'[{"subscriptionType": "contact.creation", "objectId": 42}]'
+    signature = hmac.new(b"secreto", body, hashlib.sha256).hexdigest()
+
+    with patch.object(outbound_handler, "_outbound_handler", handler), \
+            patch.object(webhook_handler, "_get_orphan_monitor", AsyncMock(return_value=monitor)):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            resp = await client.post("/whatsapp/hubspot/webhook", content=body,
+                                     headers={"X-HubSpot-Signature": "00" * 32})
+            assert resp.status_code == 401, resp.status_code
+            assert monitor.schedule_new_contacts_check.call_count == 0, "Firma inválida no programa trabajo"
+
+            resp = await client.post("/whatsapp/hubspot/webhook", content=body,
+                                     headers={"X-HubSpot-Signature": signature})
+            assert resp.status_code == 200 and resp.json()["status"] == "ok", resp.text
+    monitor.schedule_new_contacts_check.assert_called_once_with(["42"])
+    print("  [PASS] Firma inválida → 401 sin trabajo; firma válida programa la verificación")
+
+
+# ── Runner ─────────────────────────────────────────────────────────────────
+
+async def run_all():
+    tests = [
+        ("Test 1: ACK inmediato + entrega en background", test_1_webhook_acks_then_delivers),
+        ("Test 2: Envio fallido sin Timeline", test_2_failed_send_skips_timeline),
+        ("Test 3: Telefono via HubSpot + cache", test_3_phone_from_hubspot_cached),
+        ("Test 4: Firma HMAC", test_4_signature_verification),
+        ("Test 5: Cachés de teléfono en un MGET", test_5_phone_caches_single_mget),
+        ("Test 6: Pausa en el estado de conversacion", test_6_pause_uses_conversation_state),
+        ("Test 7: Firma en /hubspot/webhook", test_7_hubspot_webhook_requires_signature),
+    ]
+
+    passed = 0
+    failed = 0
+
+    print("\n" + "=" * 60)
+    print("  Tests — OutboundHandler")
+    print("=" * 60 + "\n")
+
+    for name, test_fn in tests:
+        try:
+            print(f"[RUN] {name}")
+            await test_fn()
+            passed += 1
+        except AssertionError as e:
+            print(f"  [FAIL] {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  [ERROR] {type(e).__name__}: {e}")
+            failed += 1
+
+    print(f"\n{'=' * 60}")
+    print(f"  Resultado: {passed} PASS | {failed} FAIL")
+    print(f"{'=' * 60}\n")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = asyncio.run(run_all())
+    sys.exit(0 if success else 1)